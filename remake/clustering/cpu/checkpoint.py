@@ -0,0 +1,81 @@
+import numpy as np
+import os
+from typing import List
+
+
+class Checkpoint:
+
+    def __init__(self, metric: str, labels: List[str], counts: np.ndarray, counter: int,
+                 dataset_index: int, hyper_index: int) -> None:
+        """
+        The init function of the checkpoint, it holds everything needed to resume a CPU run.
+
+        Parameters:
+        -----------
+        metric: str
+            The metric of the run.
+        labels: List[str]
+            The strategies of the matrix.
+        counts: np.ndarray
+            The co-occurrence counts, shaped strategy x strategy.
+        counter: int
+            The number of the next clustering.
+        dataset_index: int
+            The position of the dataset the run continues with.
+        hyper_index: int
+            The number of already clustered hyperparameter configurations of that dataset.
+
+        Returns:
+        --------
+        None
+        """
+        self.metric = metric
+        self.labels = labels
+        self.counts = counts
+        self.counter = counter
+        self.dataset_index = dataset_index
+        self.hyper_index = hyper_index
+
+    def save(self, path: str) -> None:
+        """
+        Function to write the checkpoint as .npz file. It is written to a temporary file first,
+        so a job killed while saving never leaves a corrupted checkpoint behind.
+
+        Parameters:
+        -----------
+        path: str
+            The path of the checkpoint.
+
+        Returns:
+        --------
+        None
+        """
+        with open(path + ".tmp", "wb") as file:
+            np.savez(
+                file,
+                metric=np.array(self.metric),
+                labels=np.array(self.labels),
+                counts=self.counts,
+                position=np.array([self.counter, self.dataset_index, self.hyper_index], dtype=np.int64),
+            )
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        """
+        Function to read a checkpoint written by save.
+
+        Parameters:
+        -----------
+        path: str
+            The path of the checkpoint.
+
+        Returns:
+        --------
+        checkpoint : Checkpoint
+            The loaded checkpoint.
+        """
+        with np.load(path) as file:
+            counter, dataset_index, hyper_index = file["position"].tolist()
+            return cls(str(file["metric"]), file["labels"].tolist(), file["counts"].astype(np.int64),
+                       counter, dataset_index, hyper_index)
@@ -1,12 +1,91 @@
 import pandas as pd
 import numpy as np
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
-from typing import List
+from sklearn.decomposition import PCA, IncrementalPCA
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.exceptions import ConvergenceWarning
+from typing import List, Tuple
 import os
 import traceback
+import warnings
 from .matrix import Matrix
 
+
+def fit_labels(pca_model: PCA, kmeans_model: KMeans, data: np.ndarray, pca: bool) -> np.ndarray | None:
+    """
+    Clusters the strategies of one hyperparameter configuration, with PCA if reduction of
+    dimensions is requested.
+
+    Parameters:
+    -----------
+    pca_model: PCA
+        The PCA which is refitted on the data.
+    kmeans_model: KMeans
+        The KMeans which is refitted on the data.
+    data: np.ndarray
+        The data for clustering, shaped strategy x AL-cycle.
+    pca: bool
+        Specifies if PCA is necessary.
+
+    Returns:
+    --------
+    k_labels : np.ndarray | None
+        The cluster label of every strategy, None if the clustering failed.
+    """
+    if pca:
+        try:
+            data = pca_model.fit_transform(data)
+        except Exception as e:
+            code_snippet = traceback.format_exc()
+            print(f"Error in PCA! : {code_snippet}")
+    try:
+        return kmeans_model.fit_predict(data)
+    except Exception as e:
+        code_snippet = traceback.format_exc()
+        print(f"Error in KMeans! : {code_snippet}")
+        return None
+
+
+# the estimators of a worker process, created once by init_worker
+_worker_estimators = None
+
+
+def init_worker(config) -> None:
+    """
+    Initializer for the clustering pool, every worker creates its estimators only once.
+
+    Parameters:
+    -----------
+    config: DictConfig
+        The config for the CPU kmeans.
+
+    Returns:
+    --------
+    None
+    """
+    global _worker_estimators
+    # hide potential convergence warning to avoid output log overflow
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    _worker_estimators = KmeansCPU.create_estimators(config)
+
+
+def cluster_worker(task: Tuple[np.ndarray, bool]) -> np.ndarray | None:
+    """
+    Clusters one hyperparameter configuration in a worker of the clustering pool.
+
+    Parameters:
+    -----------
+    task: Tuple[np.ndarray, bool]
+        The data shaped strategy x AL-cycle and whether PCA is necessary.
+
+    Returns:
+    --------
+    k_labels : np.ndarray | None
+        The cluster label of every strategy, None if the clustering failed.
+    """
+    data, pca = task
+    return fit_labels(*_worker_estimators, data, pca)
+
+
 class KmeansCPU:
 
     def __init__(self, config, labels:List[str], result_path:str) -> None:
@@ -28,9 +107,13 @@ class KmeansCPU:
         """
         self.config = config
         self.labels = labels
-        self.pca = PCA(n_components=self.config["num_components"], svd_solver=self.config["svd_solver"])
-        self.kmeans = KMeans(n_clusters=self.config["num_clusters"], init="k-means++", n_init="auto", tol=1e-4, max_iter=50)
+        self.pca, self.kmeans = self.create_estimators(config)
         self.matrix = Matrix(labels, result_path)
+        # cluster labels which aren't added to the matrix yet, flushed in chunks
+        self.label_buffer: List[np.ndarray] = []
+        self.buffer_size = self.config.get("label_buffer", 64)
+        # incremental estimators for the streaming mode, see stream_step
+        self.reset_stream()
 
     def step(self, data: np.ndarray, pca: bool, wb:bool, metric:str) -> None:
         """
@@ -50,25 +133,149 @@ class KmeansCPU:
         --------
         None
         """
+        k_labels = fit_labels(self.pca, self.kmeans, data, pca)
+        if k_labels is not None:
+            self.add_labels(k_labels, wb, metric)
+
+    def add_labels(self, k_labels: np.ndarray, wb: bool, metric: str) -> None:
+        """
+        Buffers the cluster labels of one clustering, e.g. computed by cluster_worker.
+
+        Parameters:
+        -----------
+        k_labels: np.ndarray
+            The cluster label of every strategy.
+        wb: bool
+            Specifies if we would like to write back temporary results.
+        metric: str
+            The metric we calculate on.
+
+        Returns:
+        --------
+        None
+        """
+        self.label_buffer.append(k_labels)
+        if len(self.label_buffer) >= self.buffer_size:
+            self.flush()
+        if wb:
+            self.flush()
+            self.matrix.write_numeric_to_csv(metric)
+            self.matrix.write_numeric_normalized_to_csv(metric)
+
+    @staticmethod
+    def create_estimators(config) -> Tuple[PCA, KMeans]:
+        """
+        Creates the PCA and KMeans estimators which are refitted for every clustering.
+
+        Parameters:
+        -----------
+        config: DictConfig
+            The config for the CPU kmeans.
+
+        Returns:
+        --------
+        pca : PCA
+            The PCA for the reduction of dimensions.
+        kmeans : KMeans
+            The KMeans for the clustering.
+        """
+        pca = PCA(n_components=config["num_components"], svd_solver=config["svd_solver"])
+        kmeans = KMeans(n_clusters=config["num_clusters"], init="k-means++", n_init="auto", tol=1e-4, max_iter=50)
+        return pca, kmeans
+
+    def reset_stream(self) -> None:
+        """
+        Creates fresh incremental estimators, e.g. before the stream of a new dataset starts.
+
+        Parameters:
+        -----------
+        None
+
+        Returns:
+        --------
+        None
+        """
+        self.stream_pca = IncrementalPCA(n_components=self.config["num_components"])
+        self.stream_kmeans = MiniBatchKMeans(n_clusters=self.config["num_clusters"], init="k-means++", n_init="auto", tol=1e-4, max_iter=50)
+
+    def stream_step(self, chunk: np.ndarray, pca: bool, wb: bool, metric: str) -> None:
+        """
+        Performs one streaming clustering step on a chunk of hyper-configs. Unlike step, the
+        estimators aren't refitted but updated with partial_fit. Note that this changes the
+        clustering: in the cpu mode every hyper-config gets its own KMeans, here one KMeans
+        sees the strategies of all hyper-configs of the stream, so all hyper-configs share
+        the same centroids (and PCA). Every hyper-config of the chunk is still labeled on its
+        own. A chunk whose PCA fails is skipped, because data of the wrong width would break
+        the KMeans of the whole stream.
+
+        Parameters:
+        -----------
+        chunk: np.ndarray
+            The data for clustering, shaped hyper-config x strategy x AL-cycle.
+        pca: bool
+            Specifies if an incremental PCA is necessary.
+        wb: bool
+            Specifies if we would like to write back temporary results.
+        metric: str
+            The metric we calculate on.
+
+        Returns:
+        --------
+        None
+        """
+        num_hypers, num_strategies, _ = chunk.shape
+        data = chunk.reshape(num_hypers * num_strategies, -1)
         if pca:
             try:
-                data = self.pca.fit_transform(data)
+                self.stream_pca.partial_fit(data)
             except Exception as e:
                 code_snippet = traceback.format_exc()
                 print(f"Error in PCA! : {code_snippet}")
+                # an already fitted PCA still reduces the chunk, e.g. a last chunk with fewer rows than components
+                if getattr(self.stream_pca, "components_", None) is None:
+                    return
+            try:
+                data = self.stream_pca.transform(data)
+            except Exception as e:
+                code_snippet = traceback.format_exc()
+                print(f"Error in PCA! : {code_snippet}")
+                return
         try:
-            k_labels: np.ndarray = self.kmeans.fit_predict(data)
+            self.stream_kmeans.partial_fit(data)
+            k_labels: np.ndarray = self.stream_kmeans.predict(data).reshape(num_hypers, num_strategies)
         except Exception as e:
             code_snippet = traceback.format_exc()
-            print(f"Error in PCA! : {code_snippet}")
-        self.matrix.update(self.labels, k_labels)
+            print(f"Error in streaming KMeans! : {code_snippet}")
+            return
+        self.label_buffer.extend(k_labels)
+        if len(self.label_buffer) >= self.buffer_size:
+            self.flush()
         if wb:
+            self.flush()
             self.matrix.write_numeric_to_csv(metric)
             self.matrix.write_numeric_normalized_to_csv(metric)
 
+    def flush(self) -> None:
+        """
+        Adds all buffered cluster labels to the matrix in one batch.
+
+        Parameters:
+        -----------
+        None
+
+        Returns:
+        --------
+        None
+        """
+        if self.label_buffer:
+            self.matrix.update_batch(self.labels, np.stack(self.label_buffer))
+            self.label_buffer = []
+
     @property
     def get_matrix(self):
         """
+        Flushes the buffered cluster labels before returning the matrix.
+
         Parameters:
         -----------
         None
@@ -78,6 +285,7 @@ class KmeansCPU:
         matrix : Matrix
             The matrix for tracking cluster results.
         """
+        self.flush()
         return self.matrix
 
     @property
@@ -6,6 +6,7 @@ import os
 from collections import defaultdict
 import json
 import csv
+from .partial import provenance, write_partial
 
 class Matrix:
 
@@ -27,9 +28,32 @@ class Matrix:
         if not os.path.exists(result_path):
             raise FileNotFoundError("Result path does not exist!")
         self.labels = labels
-        self.values = pd.DataFrame(index=self.labels, columns=self.labels, data=0)
+        self.matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        self.positions = {label: position for position, label in enumerate(labels)}
         self.result_path = result_path
 
+    @property
+    def values(self) -> pd.DataFrame:
+        """
+        The matrix as dataframe, built on every access.
+
+        Parameters:
+        -----------
+        None
+
+        Returns:
+        --------
+        values : pd.DataFrame
+            The matrix with the labels as row and column index.
+        """
+        return pd.DataFrame(index=self.labels, columns=self.labels, data=self.matrix)
+
+    @values.setter
+    def values(self, df: pd.DataFrame) -> None:
+        self.labels = df.index.to_list()
+        self.matrix = df.to_numpy(copy=True)
+        self.positions = {label: position for position, label in enumerate(self.labels)}
+
     def update(self, strategies: List[str], labels: np.ndarray) -> None:
         """
 
@@ -44,17 +68,57 @@ class Matrix:
         --------
         None
         """
-        strategy_label_dict: Dict[str, int] = {
-            strategy: label for strategy, label in zip(strategies, labels)
+        self.update_batch(strategies, np.asarray(labels)[np.newaxis, :])
+
+    def update_batch(self, strategies: List[str], label_matrix: np.ndarray) -> None:
+        """
+        Function to add many clustering results at once, one row of labels per clustering.
+
+        Parameters:
+        -----------
+        strategies: List[str]
+            The strategies as List, one per column of the label matrix.
+        label_matrix: np.ndarray
+            The calculated cluster labels, shaped clustering x strategy.
+
+        Returns:
+        --------
+        None
+        """
+        # if a strategy occurs more than once its last label counts
+        strategy_column: Dict[str, int] = {
+            strategy: column for column, strategy in enumerate(strategies)
         }
-        for strategy, label in strategy_label_dict.items():
-            same_cluster: List[str] = [
-                key for key, value in strategy_label_dict.items()
-                if value == label and label >= 0
-            ]
-            for label_to_strategy in same_cluster:
-                self.values.loc[strategy, label_to_strategy] += 1
-        return
+        positions = np.array([self.positions[strategy] for strategy in strategy_column], dtype=np.intp)
+        label_matrix = np.asarray(label_matrix, dtype=np.int64)[:, list(strategy_column.values())]
+
+        # noise labels (-1) are never counted
+        clusterings, columns = np.nonzero(label_matrix >= 0)
+        if columns.size == 0:
+            return
+
+        # every cluster of every clustering gets its own one-hot column
+        cluster_labels = label_matrix[clusterings, columns]
+        _, cluster_index = np.unique(clusterings * (cluster_labels.max() + 1) + cluster_labels, return_inverse=True)
+        onehot = np.zeros((positions.size, cluster_index.max() + 1), dtype=np.int64)
+        onehot[columns, cluster_index] = 1
+        self.matrix[np.ix_(positions, positions)] += onehot @ onehot.T
+
+    def add_counts(self, counts: np.ndarray) -> None:
+        """
+        Function to add the counts of a partial matrix with the same labels, e.g. of a
+        single dataset.
+
+        Parameters:
+        -----------
+        counts: np.ndarray
+            The partial co-occurrence counts, shaped like the matrix.
+
+        Returns:
+        --------
+        None
+        """
+        self.matrix += np.asarray(counts, dtype=np.int64)
 
     def get_results_as_dict(self) -> Dict[str, List[str]]:
         """
@@ -130,6 +194,23 @@ class Matrix:
 
         self.values.to_csv(os.path.join(self.result_path, f"numeric_cluster_results_{metric}.csv"), index=True, mode=mode)
 
+    def write_partial(self, metric: str) -> None:
+        """
+        Function to write the counts as binary partial for the reduce stage, see
+        helper/process_cluster_matrices.py.
+
+        Parameters:
+        -----------
+        metric : str
+            The metric the file should correspond to.
+
+        Returns:
+        --------
+        None
+        """
+        write_partial(os.path.join(self.result_path, f"partial_{metric}.npz"), self.matrix, self.labels,
+                      provenance(metric))
+
     def write_final_numeric_csv(self):
         """
         Function to write the final numeric results to csv.
@@ -202,7 +283,7 @@ class Matrix:
         --------
         None
         """
-        diagonal: List[int] = [self.values.iloc[i][i] for i in range(len(self.labels))]
+        diagonal: List[int] = np.diag(self.matrix).tolist()
         try:
             assert all(x == diagonal[0] for x in diagonal)
         except:
@@ -224,7 +305,7 @@ class Matrix:
         None
         """
         # create an 2-dimensional array
-        return self.values.values.tolist()
+        return self.matrix.tolist()
 
     def set_values(self, df: pd.DataFrame) -> None:
         """
@@ -0,0 +1,86 @@
+import numpy as np
+import json
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+# the version of the partial file layout, stored in every header
+PARTIAL_VERSION = 1
+
+
+def provenance(metric: str) -> Dict:
+    """
+    Function to describe where a partial matrix was computed.
+
+    Parameters:
+    -----------
+    metric: str
+        The metric the matrix was computed on.
+
+    Returns:
+    --------
+    header : Dict
+        The version, metric, host, SLURM job and array task and the creation time.
+    """
+    return {
+        "version": PARTIAL_VERSION,
+        "metric": metric,
+        "host": socket.gethostname(),
+        "job": os.environ.get("SLURM_ARRAY_JOB_ID", os.environ.get("SLURM_JOB_ID")),
+        "task": os.environ.get("SLURM_ARRAY_TASK_ID"),
+        "created": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def write_partial(path: str, counts: np.ndarray, labels: List[str], header: Dict) -> None:
+    """
+    Function to write a partial co-occurrence matrix as .npz file. It is written to a temporary
+    file first, so a reducer never reads a half written partial.
+
+    Parameters:
+    -----------
+    path: str
+        The path of the partial.
+    counts: np.ndarray
+        The co-occurrence counts, shaped label x label.
+    labels: List[str]
+        The strategies in the order of the rows and columns.
+    header: Dict
+        The provenance of the partial, see provenance.
+
+    Returns:
+    --------
+    None
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if counts.shape != (len(labels), len(labels)):
+        raise ValueError(f"The counts are shaped {counts.shape}, but there are {len(labels)} labels.")
+    with open(path + ".tmp", "wb") as file:
+        np.savez(file, counts=counts, labels=np.array(labels, dtype=str), header=np.array(json.dumps(header)))
+    os.replace(path + ".tmp", path)
+
+
+def read_partial(path: str) -> Tuple[np.ndarray, List[str], Dict]:
+    """
+    Function to read a partial written by write_partial.
+
+    Parameters:
+    -----------
+    path: str
+        The path of the partial.
+
+    Returns:
+    --------
+    counts : np.ndarray
+        The co-occurrence counts, shaped label x label.
+    labels : List[str]
+        The strategies in the order of the rows and columns.
+    header : Dict
+        The provenance of the partial.
+    """
+    with np.load(path) as file:
+        header = json.loads(str(file["header"]))
+        if header.get("version") != PARTIAL_VERSION:
+            raise ValueError(f"The partial {path} has the unknown version {header.get('version')}.")
+        return file["counts"].astype(np.int64), file["labels"].tolist(), header
@@ -9,7 +9,8 @@ class KMeansTorch:
     This class contains the functionality for KMeans on large matrices running completly on gpu-accelerated.
     """
 
-    def __init__(self, num_cluster: int, error: float, device:str) -> None:
+    def __init__(self, num_cluster: int, error: float, device:str, max_iter: int = 300, n_init: int = 1,
+                 init: str = "k-means++", seed: int | None = None) -> None:
         """
         Init function.
 
@@ -19,6 +20,14 @@ class KMeansTorch:
             the number of allowed cluster centers
         error : float
             the error in distortion change
+        max_iter : int
+            the maximum number of iterations of a single run
+        n_init : int
+            the number of restarts per problem, the run with the lowest distortion is kept
+        init : str
+            "k-means++" for k-means++ seeding or "first" to start with the first points
+        seed : int | None
+            the seed for the k-means++ seeding
 
         Returns:
         --------
@@ -27,6 +36,14 @@ class KMeansTorch:
         self.num_clusters = num_cluster
         self.device = device
         self.error = torch.tensor(error).to(self.device)
+        self.max_iter = max_iter
+        self.n_init = n_init
+        self.init = init
+        self.generator = torch.Generator(device=self.device)
+        if seed is not None:
+            self.generator.manual_seed(seed)
+        else:
+            self.generator.seed()
 
     def fit(self, data: Tensor) -> Tuple[Tensor, Tensor]:
         """
@@ -43,63 +60,131 @@ class KMeansTorch:
             centroids - the centers of the single clusters
             assignments - the assigned label to each input matrix
         """
-        starting_time = time.time()
         # if the are more requested cluster_centers than entries in the tensor update the count of centers
         if data.size()[0] < self.num_clusters:
             self.num_clusters = data.size()[0]
 
-        # converts collection of tensors into a single 3 dimensional Tensor
-        input: Tensor = torch.Tensor(data).to(self.device)
+        # the frobenius distance of matrices is the euclidean distance of the flattened matrices
+        input: Tensor = torch.as_tensor(data, dtype=torch.float32)
+        centroids, assignments = self.fit_batched(input.reshape(1, input.shape[0], -1))
+        return centroids[0].reshape(-1, *input.shape[1:]), assignments[0]
+
+    def fit_batched(self, data: Tensor) -> Tuple[Tensor, Tensor]:
+        """
+        Performs independent kmeans clusterings on many small problems at once. Every problem
+        is solved n_init times in parallel, every run stops as soon as its own distortion
+        change is less than the error or after max_iter iterations. The run with the lowest
+        distortion is returned per problem.
 
-        # initialize ceentroids with the first matrices
-        centroids: Tensor = input[: self.num_clusters, :].clone().to(self.device)
+        Paramters:
+        ----------
+        data : Tensor
+            the data shaped problems x points x features
+
+        Returns:
+        --------
+        centroids, assignments : Tuple[Tensor, Tensor]
+            centroids - the centers per problem, shaped problems x clusters x features
+            assignments - the assigned label of every point, shaped problems x points
+        """
+        starting_time = time.time()
+        input: Tensor = torch.as_tensor(data, dtype=torch.float32).to(self.device)
+        num_problems, num_points, num_features = input.shape
+        num_clusters: int = min(self.num_clusters, num_points)
+        # the restarts are an additional batch dimension: problems x restarts x points x features
+        points: Tensor = input[:, None].expand(-1, self.n_init, -1, -1)
 
-        # initialize the distorsion
-        distorsion: Tensor = torch.tensor([0.0]).to(self.device)
+        centroids: Tensor = self._init_centroids(points, num_clusters)
+        distorsion: Tensor = torch.zeros((num_problems, self.n_init), device=self.device)
+        # marks the runs that haven't converged yet
+        active: Tensor = torch.ones((num_problems, self.n_init), dtype=torch.bool, device=self.device)
 
         # set a counter for needed iterations:
         counter: int = 0
-        # run kmeans iterations
-        while True:
-            # update the counter in every step
+        while counter < self.max_iter and bool(active.any()):
             counter += 1
-            # save the old distorsion value
-            distorsion_old: Tensor = torch.clone(distorsion)
-            # reset distorsion
-            distorsion = torch.zeros_like(distorsion)
-            # calculates the distance between all matrices in the 2nd and 3rd dimension
-            # attention: to match the dimensions we extend the input to a dummy 4th dimension
-            distances: Tensor = torch.norm(
-                input[:, None] - centroids, p="fro", dim=(2, 3)
+            # assign every point to the centroid with the shortest distance
+            distances: Tensor = torch.cdist(points, centroids)
+            assignment: Tensor = torch.argmin(distances, dim=3)
+
+            # update the centroids: sum up the points per cluster with scatter_add
+            index: Tensor = assignment[..., None].expand(-1, -1, -1, num_features)
+            sums: Tensor = torch.zeros_like(centroids).scatter_add_(2, index, points)
+            counts: Tensor = torch.zeros(centroids.shape[:3], device=self.device).scatter_add_(
+                2, assignment, torch.ones_like(assignment, dtype=torch.float32)
+            )
+            new_centroids: Tensor = sums / counts.clamp(min=1)[..., None]
+
+            # re-seed empty clusters with the points farthest away from their centroid
+            empty: Tensor = counts == 0
+            if bool(empty.any()):
+                point_distances: Tensor = torch.gather(distances, 3, assignment[..., None]).squeeze(3)
+                farthest: Tensor = torch.topk(point_distances, num_clusters, dim=2).indices
+                rank: Tensor = (torch.cumsum(empty, dim=2) - 1).clamp(min=0)
+                reseed: Tensor = torch.gather(farthest, 2, rank)
+                reseed_points: Tensor = torch.gather(points, 2, reseed[..., None].expand(-1, -1, -1, num_features))
+                new_centroids = torch.where(empty[..., None], reseed_points, new_centroids)
+
+            centroids = torch.where(active[..., None, None], new_centroids, centroids)
+
+            # calculate distortion: distorsion = sum(||x-centroid||^2) per run
+            distorsion_old: Tensor = distorsion
+            distorsion = torch.sum(torch.square(points - torch.gather(centroids, 2, index)), dim=(2, 3))
+
+            # runs whose distortion change is less than our formal requirement stop
+            active &= ~torch.lt(torch.abs(distorsion - distorsion_old), self.error)
+
+        # final assignment and distortion of every run, keep the best run per problem
+        distances = torch.cdist(points, centroids)
+        min_distances, assignment = torch.min(distances, dim=3)
+        best: Tensor = torch.argmin(torch.sum(torch.square(min_distances), dim=2), dim=1)
+        problems: Tensor = torch.arange(num_problems, device=self.device)
+
+        # TODO: write message into logger instead in print out
+        print(
+            f"Used {counter} iterations for {num_problems} problems in {time.time()-starting_time} seconds on {self.device}."
+        )
+        return centroids[problems, best], assignment[problems, best]
+
+    def _init_centroids(self, points: Tensor, num_clusters: int) -> Tensor:
+        """
+        Function to choose the initial centroids of every run.
+
+        Paramters:
+        ----------
+        points : Tensor
+            the data shaped problems x restarts x points x features
+        num_clusters : int
+            the number of centroids per run
+
+        Returns:
+        --------
+        centroids : Tensor
+            the initial centroids shaped problems x restarts x clusters x features
+        """
+        if self.init == "first":
+            return points[:, :, :num_clusters].clone()
+
+        num_problems, num_restarts, num_points, num_features = points.shape
+        runs: int = num_problems * num_restarts
+        flat_points: Tensor = points.reshape(runs, num_points, num_features)
+
+        # k-means++: the first centroid is drawn uniformly, every further one with a probability
+        # proportional to the squared distance to the closest centroid chosen so far
+        chosen: Tensor = torch.randint(num_points, (runs, 1), device=self.device, generator=self.generator)
+        centroids: Tensor = torch.gather(flat_points, 1, chosen[..., None].expand(-1, -1, num_features))
+        closest: Tensor = torch.cdist(flat_points, centroids).squeeze(2).square()
+        for _ in range(1, num_clusters):
+            # runs whose points all coincide with a centroid draw uniformly
+            weights: Tensor = torch.where(
+                closest.sum(dim=1, keepdim=True) > 0, closest, torch.ones_like(closest)
             )
+            chosen = torch.multinomial(weights, 1, generator=self.generator)
+            centroid: Tensor = torch.gather(flat_points, 1, chosen[..., None].expand(-1, -1, num_features))
+            centroids = torch.cat([centroids, centroid], dim=1)
+            closest = torch.minimum(closest, torch.cdist(flat_points, centroid).squeeze(2).square())
 
-            # assign the matrix to the centroid with the shortest distance
-            assignment: Tensor = torch.argmin(distances, dim=1)
-            # update cluster centroids:
-            for i in range(self.num_clusters):
-                # extraxt matrices that are assigned to the i'th cluster
-                cluster_matrices = input[assignment == i]
-                # recalculate the centroids
-                centroids[i] = torch.mean(cluster_matrices, dim=0)
-                # calculate distortion: distorsion = sum(||x-centroid||_F^2)
-                distorsion += torch.sum(
-                    torch.square(
-                        torch.norm(cluster_matrices - centroids[i], p="fro", dim=(1, 2))
-                    )
-                )
-
-            # if the distortion change is less than our formal formal requirement stop
-            if torch.lt(
-                abs(distorsion - distorsion_old),
-                self.error,
-            ):
-                # TODO: write message into logger instead in print out
-                print(
-                    f"Used {counter} iterations in {time.time()-starting_time} seconds on {self.device}."
-                )
-                break
-
-        return centroids, assignment
+        return centroids.reshape(num_problems, num_restarts, num_clusters, num_features)
 
     def adjust_error(self, error: float) -> None:
         """
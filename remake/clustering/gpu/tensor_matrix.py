@@ -30,33 +30,41 @@ class TensorMatrix:
 
     def update(self, labels:torch.Tensor) -> None:
         """
-        Function to update the matrix values after clustering.
+        Function to update the matrix values after clustering. Runs completely on the device
+        without synchronizing with the host. Equal labels count as one cluster, whatever
+        their value (negative labels included).
 
         Parameters:
         -----------
         labels : torch.Tensor
-            The labels of the data vectors.
+            The labels of the data vectors, either one clustering shaped (labels,) or a batch
+            of clusterings shaped (clusterings, labels).
 
         Returns:
         --------
         None
         """
-        label_dict = defaultdict(list)
-        for i, val in enumerate(labels):
-            label_dict[val.item()].append(i)
-        for eq in list(dict(label_dict).values()):
-            for i in eq:
-                for j in eq:
-                    self.values[i, j] += 1
-    
-    
-    def write_back(self) -> None:
+        labels = torch.as_tensor(labels, device=self.values.device)
+        if labels.dim() == 1:
+            labels = labels.unsqueeze(0)
+        num_batches, num_labels = labels.shape
+        # map every label to the position of its first occurrence, so the cluster ids are
+        # in [0, num_labels) without knowing the label values on the host
+        same: torch.Tensor = labels[:, :, None] == labels[:, None, :]
+        cluster_ids: torch.Tensor = torch.argmax(same.to(torch.uint8), dim=2)
+        # one-hot assignments of every clustering side by side, shaped labels x (clusterings * labels)
+        onehot: torch.Tensor = torch.nn.functional.one_hot(cluster_ids, num_labels).to(torch.float32)
+        onehot = onehot.permute(1, 0, 2).reshape(num_labels, num_batches * num_labels)
+        self.values += torch.round(onehot @ onehot.T).to(self.values.dtype)
+
+    def write_back(self, name:str = "kmeans") -> None:
         """
         Function to write the matrix back to the disk.
 
         Parameters:
         -----------
-        None
+        name : str
+            The file name without extension.
 
         Returns:
         --------
@@ -64,4 +72,4 @@ class TensorMatrix:
         """
         if not os.path.exists(self.directory):
             os.makedirs(self.directory)
-        np.savetxt(f"{self.directory}/kmeans.csv", self.values.cpu().numpy())
+        np.savetxt(f"{self.directory}/{name}.csv", self.values.cpu().numpy())
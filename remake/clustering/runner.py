@@ -2,11 +2,15 @@ from enum import Enum
 from omegaconf import OmegaConf, DictConfig
 from .gpu.kmeans_torch import KMeansTorch
 from .gpu.tensor_matrix import TensorMatrix
-from data.loader import DataLoader
-from .cpu.kmeans_cpu import KmeansCPU
+from data.loader import DataLoader, init_load_worker
+from .cpu.kmeans_cpu import KmeansCPU, init_worker, cluster_worker, fit_labels
+from .cpu.checkpoint import Checkpoint
 import multiprocessing as mp
+import os
 import numpy as np
+import pandas as pd
 from time import time
+from typing import List, Tuple
 import torch
 import warnings
 from sklearn.exceptions import ConvergenceWarning
@@ -28,10 +32,56 @@ class STACKED(Enum):
     DATASET = 1
 
 
+# the runner of a dataset worker, set once by _init_dataset_worker
+_dataset_runner = None
+
+
+def _init_dataset_worker(runner: "ClusterRunner") -> None:
+    """
+    Initializer for the dataset pool, the runner is only sent once to every worker.
+    """
+    global _dataset_runner
+    # hide potential convergence warning to avoid output log overflow
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    _dataset_runner = runner
+
+
+def _init_cpu_worker(config: DictConfig, data: DataLoader) -> None:
+    """
+    Initializer for the pool of a CPU run, its workers load the frames and cluster.
+    """
+    init_worker(config)
+    init_load_worker(data)
+
+
+def _dataset_worker(task: Tuple[str, str, int]) -> Tuple[np.ndarray, int]:
+    """
+    Clusters all hyperparameter configurations of a dataset into a partial matrix.
+
+    Parameters:
+    -----------
+    task : Tuple[str, str, int]
+        The dataset, the metric and the number of already clustered configurations.
+
+    Returns:
+    --------
+    counts : np.ndarray
+        The co-occurrence counts of the dataset, shaped strategy x strategy.
+    num_clustered : int
+        The number of clustered hyperparameter configurations.
+    """
+    dataset, metric, skip = task
+    runner = _dataset_runner
+    cluster = KmeansCPU(runner.cpu_config, runner.data.get_strategies(), runner.config["save_dir"])
+    # workers of a pool can't start pools of their own
+    num_clustered = runner._cluster_dataset(cluster, dataset, metric, 1, parallel_load=False, skip=skip) - 1
+    return cluster.get_matrix.matrix, num_clustered
+
+
 class ClusterRunner:
 
     def __init__(self, mode: MODE, config: DictConfig, data: DataLoader, dim_reduce: bool = False,
-                 stacked: STACKED = STACKED.SINGLE) -> None:
+                 stacked: STACKED = STACKED.SINGLE, streaming: bool = False, resume: bool = False) -> None:
         """
         The init function of the runner.
 
@@ -47,6 +97,13 @@ class ClusterRunner:
                 Specifies whether we need a reduction of dimensions.
             stacked:
                 Specifies if the data should be stacked. Only useful for GPU calculations.
+            streaming: Bool
+                Specifies whether the CPU clustering streams chunks of hyperparameters through
+                incremental estimators instead of refitting per hyperparameter. The
+                hyperparameters of a dataset then share one set of centroids, so the
+                results differ from the per-hyperparameter clustering.
+            resume: Bool
+                Specifies whether the CPU clustering continues from the checkpoint of a killed run.
 
         Returns:
         --------
@@ -69,6 +126,10 @@ class ClusterRunner:
         self.data = data
         # specifies whether we will use a dimension reduction
         self.dim_reduce = dim_reduce
+        # specifies whether the CPU clustering runs in streaming mode
+        self.streaming = streaming
+        # specifies whether the CPU clustering resumes from its checkpoint
+        self.resume = resume
 
     def _check_available_device(self) -> torch.device:
         """
@@ -107,13 +168,16 @@ class ClusterRunner:
         if self.mode == MODE.CPU:
             self._run_cpu(index)
         elif self.mode == MODE.GPU:
-            self._run_gpu()
+            self._run_gpu(index)
         else:
             raise ValueError("The mode is not specified correctly.")
 
     def _run_cpu(self, index:int) -> None:
         """
-        Function to run the clustering on the CPU.
+        Function to run the clustering on the CPU. With clustering.cpu.parallel_datasets the
+        datasets are clustered in parallel, see _run_cpu_datasets. Every
+        clustering.cpu.checkpoint_every clusterings and after every dataset a checkpoint is
+        written, a runner created with resume=True continues from it.
 
         Parameters:
         -----------
@@ -128,47 +192,331 @@ class ClusterRunner:
         warnings.filterwarnings("ignore", category=ConvergenceWarning)
         # create the clustering object
         cluster = KmeansCPU(self.cpu_config, self.data.get_strategies(), self.config["save_dir"])
-        # define a counter to track the number of calculated clusters
-        counter = 1
         metric = self.data.get_metrices()[index]
+        # define a counter to track the number of calculated clusters
+        counter, dataset_start, hyper_start = self._load_checkpoint(cluster, metric)
         # track the start time for performance issues
         start_glob = time()
-        for dataset in self.data.get_datasets():
-            start_lok = time()
-            print(f"Start experiment on {dataset} and metric {metric}")
-            runned_hypers = self.data.get_hyperparameter_for_dataset(dataset)
-            print(f"Number of experiments sampled: {len(runned_hypers)}")
-            labels, frames = self.data.load_data_for_metric_dataset(metric, dataset)
-            if labels is None and frames is None:
-                print(f"Metric {metric} wasn't sampled for every strategy on dataset {dataset}!")
-                continue
-            for hyper in runned_hypers:
-                to_process = list(zip(labels, frames, [hyper for _ in range(len(frames))]))
-                with mp.Pool(mp.cpu_count()) as pool:
-                    results = pool.map(self.data.get_row, to_process)
+        if self.cpu_config.get("parallel_datasets", False):
+            self._run_cpu_datasets(cluster, metric, counter, dataset_start, hyper_start)
+        else:
+            # a single pool for loading and clustering all datasets, the streaming mode only loads with it and
+            # clusters in this process
+            pool = mp.Pool(self.cpu_config.get("num_workers", None), initializer=_init_cpu_worker,
+                           initargs=(self.cpu_config, self.data))
+            try:
+                for dataset_index, dataset in enumerate(self.data.get_datasets()):
+                    if dataset_index < dataset_start:
+                        continue
+                    start_lok = time()
+                    skip = hyper_start if dataset_index == dataset_start else 0
+                    counter = self._cluster_dataset(cluster, dataset, metric, counter, pool,
+                                                    skip=skip, dataset_index=dataset_index)
+                    cluster.get_matrix.write_numeric_to_csv(metric)
+                    self._save_checkpoint(cluster, metric, counter, dataset_index + 1, 0)
+                    print(f"Time used for {dataset}: {time()-start_lok} sec")
+            finally:
                 pool.close()
-                results = sorted(results, key=lambda x: x[0])
-                rows = list(map(lambda x: x[1], results))
-                if all((row.shape == rows[0].shape) and (row.shape[0] != 0) for row in rows):
-                    to_cluster = np.array(rows)
-                    print(f"Clustering for the {counter}-th time.")
-                    cluster.step(to_cluster, self.dim_reduce, False, metric)
-                    counter += 1
-            cluster.get_matrix.write_numeric_to_csv(metric)
-            print(f"Time used for {dataset}: {time()-start_lok} sec")
+                pool.join()
         cluster.get_matrix.write_numeric_normalized_to_csv(metric)
+        cluster.get_matrix.write_partial(metric)
+        # the run is complete, a later run must not resume from it
+        if os.path.exists(self._checkpoint_path(metric)):
+            os.remove(self._checkpoint_path(metric))
         print(f"Terminated normally for every dataset and metric {metric} in {(time()-start_glob)/3600} hours")
 
-    def _run_gpu(self) -> None:
+    def _run_cpu_datasets(self, cluster: KmeansCPU, metric: str, counter: int, dataset_start: int,
+                          hyper_start: int) -> None:
+        """
+        Function to cluster all datasets of a metric in parallel. Every worker clusters whole
+        datasets into its own partial matrix, the partial matrices are added to the matrix of
+        the cluster object in the order of the datasets, so the result doesn't depend on the
+        scheduling of the workers.
+
+        Parameters:
+        -----------
+        cluster : KmeansCPU
+            The clustering object which collects the partial matrices.
+        metric : str
+            The metric we calculate on.
+        counter : int
+            The number of the next clustering.
+        dataset_start : int
+            The position of the first dataset to cluster.
+        hyper_start : int
+            The number of already clustered hyperparameter configurations of the first dataset.
+
+        Returns:
+        --------
+        None
+        """
+        datasets = self.data.get_datasets()
+        with mp.Pool(self.cpu_config.get("num_workers", None), initializer=_init_dataset_worker,
+                     initargs=(self,)) as pool:
+            tasks = ((dataset, metric, hyper_start if dataset_index == dataset_start else 0)
+                     for dataset_index, dataset in enumerate(datasets) if dataset_index >= dataset_start)
+            results = pool.imap(_dataset_worker, tasks)
+            for dataset_index, (counts, num_clustered) in enumerate(results, start=dataset_start):
+                print(f"Clustered {num_clustered} experiments on {datasets[dataset_index]} and metric {metric}")
+                cluster.get_matrix.add_counts(counts)
+                cluster.get_matrix.write_numeric_to_csv(metric)
+                counter += num_clustered
+                self._save_checkpoint(cluster, metric, counter, dataset_index + 1, 0)
+            pool.close()
+            pool.join()
+
+    def _cluster_dataset(self, cluster: KmeansCPU, dataset: str, metric: str, counter: int,
+                         pool=None, parallel_load: bool = True, skip: int = 0,
+                         dataset_index: int = None) -> int:
+        """
+        Function to cluster all hyperparameter configurations of a dataset.
+
+        Parameters:
+        -----------
+        cluster : KmeansCPU
+            The clustering object the labels are added to.
+        dataset : str
+            The dataset we calculate on.
+        metric : str
+            The metric we calculate on.
+        counter : int
+            The number of the next clustering.
+        pool : mp.Pool
+            The pool of the run, see _init_cpu_worker. The frames are loaded with it and, unless
+            in streaming mode, the configurations are clustered with it. Without a pool both
+            run in this process.
+        parallel_load : bool
+            Specifies whether the frames are loaded with a pool of their own if no pool is given.
+        skip : int
+            The number of hyperparameter configurations which were already clustered.
+        dataset_index : int
+            The position of the dataset, used for checkpoints. No checkpoints are written if
+            it is None.
+
+        Returns:
+        --------
+        counter : int
+            The number of the next clustering.
+        """
+        print(f"Start experiment on {dataset} and metric {metric}")
+        runned_hypers = self.data.get_hyperparameter_for_dataset(dataset)
+        print(f"Number of experiments sampled: {len(runned_hypers)}")
+        labels, frames = self.data.load_data_for_metric_dataset(metric, dataset, parallel=parallel_load, pool=pool)
+        if labels is None and frames is None:
+            print(f"Metric {metric} wasn't sampled for every strategy on dataset {dataset}!")
+            return counter
+        # the rows of every strategy need the same number of AL-cycles
+        if any(frame.shape[1] != frames[0].shape[1] for frame in frames):
+            print(f"Strategies differ in the number of AL-cycles on dataset {dataset}!")
+            return counter
+        # strategy x hyperparameter x AL-cycle
+        try:
+            rows, valid = self._stack_rows(frames, runned_hypers, np.float64)
+        except ValueError:
+            print(f"Metric {metric} contains non-numeric values on dataset {dataset}!")
+            return counter
+        to_cluster = rows[:, valid].transpose(1, 0, 2)[skip:]
+        if self.streaming:
+            # in streaming mode every dataset is an own stream of hyperparameter chunks, it is
+            # only checkpointed after the dataset
+            cluster.reset_stream()
+            chunk_size = self.cpu_config.get("stream_chunk", 32)
+            for start in range(0, to_cluster.shape[0], chunk_size):
+                cluster.stream_step(to_cluster[start:start + chunk_size], self.dim_reduce, False, metric)
+            return counter + to_cluster.shape[0]
+        if pool is None:
+            k_labels = (fit_labels(cluster.pca, cluster.kmeans, data, self.dim_reduce) for data in to_cluster)
+        else:
+            tasks = ((data, self.dim_reduce) for data in to_cluster)
+            k_labels = pool.imap(cluster_worker, tasks, chunksize=8)
+        checkpoint_every = self.cpu_config.get("checkpoint_every", 0)
+        for done, labels in enumerate(k_labels, start=skip + 1):
+            print(f"Clustering for the {counter}-th time.")
+            if labels is not None:
+                cluster.add_labels(labels, False, metric)
+            if dataset_index is not None and checkpoint_every and counter % checkpoint_every == 0:
+                self._save_checkpoint(cluster, metric, counter + 1, dataset_index, done)
+            counter += 1
+        return counter
+
+    def _checkpoint_path(self, metric: str) -> str:
+        """
+        Returns the path of the checkpoint of a metric.
+        """
+        return os.path.join(self.config["save_dir"], f"checkpoint_{metric}.npz")
+
+    def _save_checkpoint(self, cluster: KmeansCPU, metric: str, counter: int, dataset_index: int,
+                         hyper_index: int) -> None:
+        """
+        Function to write the current state of a CPU run to its checkpoint.
+
+        Parameters:
+        -----------
+        cluster : KmeansCPU
+            The clustering object, its buffered labels are flushed first.
+        metric : str
+            The metric we calculate on.
+        counter : int
+            The number of the next clustering.
+        dataset_index : int
+            The position of the dataset the run continues with.
+        hyper_index : int
+            The number of already clustered hyperparameter configurations of that dataset.
+
+        Returns:
+        --------
+        None
+        """
+        matrix = cluster.get_matrix
+        Checkpoint(metric, matrix.labels, matrix.matrix, counter, dataset_index, hyper_index).save(
+            self._checkpoint_path(metric))
+
+    def _load_checkpoint(self, cluster: KmeansCPU, metric: str) -> Tuple[int, int, int]:
+        """
+        Function to restore the matrix from the checkpoint of a metric, if the runner resumes
+        and a checkpoint exists.
+
+        Parameters:
+        -----------
+        cluster : KmeansCPU
+            The clustering object the counts are restored into.
+        metric : str
+            The metric we calculate on.
+
+        Returns:
+        --------
+        counter : int
+            The number of the next clustering.
+        dataset_index : int
+            The position of the dataset the run continues with.
+        hyper_index : int
+            The number of already clustered hyperparameter configurations of that dataset.
         """
-        Function to run clustering on the GPU.
+        path = self._checkpoint_path(metric)
+        if not self.resume or not os.path.exists(path):
+            return 1, 0, 0
+        checkpoint = Checkpoint.load(path)
+        if checkpoint.metric != metric or checkpoint.labels != list(cluster.get_matrix.labels):
+            raise ValueError(f"The checkpoint {path} doesn't belong to this run!")
+        cluster.get_matrix.matrix = checkpoint.counts
+        print(f"Resuming metric {metric} at dataset {checkpoint.dataset_index} after "
+              f"{checkpoint.hyper_index} experiments")
+        return checkpoint.counter, checkpoint.dataset_index, checkpoint.hyper_index
+
+    def _stack_rows(self, frames: List[pd.DataFrame], hypers: List[List[int]],
+                    dtype: type = np.float32) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Function to stack the rows of all strategies for all hyperparameter configurations.
 
         Parameters:
         -----------
+        frames : List[pd.DataFrame]
+            The frames of all strategies for a dataset and metric.
+        hypers : List[List[int]]
+            The hyperparameter configurations.
+        dtype : type
+            The dtype of the rows.
+
+        Returns:
+        --------
+        rows : np.ndarray
+            The rows as array of the given dtype, shaped strategy x hyperparameter x AL-cycle.
+        valid : np.ndarray
+            Marks the hyperparameter configurations every strategy has exactly one row for.
+        """
+        num_cycles = frames[0].shape[1] - 9
+        rows = np.zeros((len(frames), len(hypers), num_cycles), dtype=dtype)
+        valid = np.ones(len(hypers), dtype=bool)
+        for strategy_index, frame in enumerate(frames):
+            strategy_rows, strategy_valid = self.data.get_rows(frame, hypers)
+            rows[strategy_index] = strategy_rows
+            valid &= strategy_valid
+        return rows, valid
+
+    def _run_gpu(self, index:int) -> None:
+        """
+        Function to run clustering with torch on the GPU, or on the CPU if no accelerator is
+        available. With STACKED.DATASET all hyperparameter configurations of a dataset are
+        clustered at once, every strategy being a hyperparameter x AL-cycle matrix. With
+        STACKED.SINGLE every hyperparameter configuration is clustered on its own.
+
+        Parameters:
+        -----------
+        index : int
+            The index for the metric file we want to run the calculations on.
+
+        Returns:
+        --------
         None
+        """
+        strategies = self.data.get_strategies()
+        metric = self.data.get_metrices()[index]
+        # a single pool loads the frames of all datasets, it is forked before anything is put on the device
+        pool = mp.Pool(mp.cpu_count(), initializer=init_load_worker, initargs=(self.data,))
+        try:
+            kmeans = KMeansTorch(
+                self.gpu_config["num_clusters"],
+                self.gpu_config["error"],
+                self.device,
+                max_iter=self.gpu_config.get("max_iter", 300),
+                n_init=self.gpu_config.get("n_init", 1),
+                init=self.gpu_config.get("init", "k-means++"),
+                seed=self.gpu_config.get("seed", None),
+            )
+            matrix = TensorMatrix(self.config["save_dir"], len(strategies), self.device)
+            start_glob = time()
+            self._cluster_gpu_datasets(kmeans, matrix, metric, pool)
+        finally:
+            pool.close()
+            pool.join()
+        matrix.write_back(f"kmeans_{metric}")
+        print(f"Terminated normally for every dataset and metric {metric} in {(time()-start_glob)/3600} hours")
+
+    def _cluster_gpu_datasets(self, kmeans: KMeansTorch, matrix: TensorMatrix, metric: str, pool) -> None:
+        """
+        Function to cluster all datasets of a metric with torch.
+
+        Parameters:
+        -----------
+        kmeans : KMeansTorch
+            The torch KMeans.
+        matrix : TensorMatrix
+            The matrix the cluster assignments are added to.
+        metric : str
+            The metric we calculate on.
+        pool : mp.Pool
+            The pool the frames are loaded with, see init_load_worker.
 
         Returns:
         --------
         None
         """
-        return
+        for dataset in self.data.get_datasets():
+            start_lok = time()
+            print(f"Start experiment on {dataset} and metric {metric}")
+            runned_hypers = self.data.get_hyperparameter_for_dataset(dataset)
+            labels, frames = self.data.load_data_for_metric_dataset(metric, dataset, pool=pool)
+            if labels is None and frames is None:
+                print(f"Metric {metric} wasn't sampled for every strategy on dataset {dataset}!")
+                continue
+            if any(frame.shape[1] != frames[0].shape[1] for frame in frames):
+                print(f"Strategies differ in the number of AL-cycles on dataset {dataset}!")
+                continue
+            try:
+                rows, valid = self._stack_rows(frames, runned_hypers)
+            except ValueError:
+                print(f"Metric {metric} contains non-numeric values on dataset {dataset}!")
+                continue
+            print(f"Number of experiments sampled: {int(valid.sum())} of {len(runned_hypers)}")
+            if not valid.any():
+                continue
+            # strategy x hyperparameter x AL-cycle, KMeansTorch moves it onto the device
+            data = torch.from_numpy(rows[:, valid])
+            if self.stacked == STACKED.DATASET:
+                _, assignment = kmeans.fit(data)
+                matrix.update(assignment)
+            else:
+                # every hyperparameter configuration is an own problem: hyperparameter x strategy x AL-cycle
+                _, assignments = kmeans.fit_batched(data.permute(1, 0, 2))
+                matrix.update(assignments)
+            print(f"Time used for {dataset}: {time()-start_lok} sec")
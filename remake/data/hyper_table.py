@@ -0,0 +1,76 @@
+import numpy as np
+import os
+import tempfile
+from typing import Dict, List
+
+
+def compile_hyper_table(mapping: Dict[str, List[List[int]]], path: str = None) -> Dict[str, np.ndarray]:
+    """
+    Function to compile the dataset to hyperparameter mapping into a binary .npz file. All
+    hyperparameter configurations are stored in one int32 array, the configurations of a dataset
+    are the rows between its two offsets.
+
+    Parameters:
+    -----------
+    mapping : Dict[str, List[List[int]]]
+        The hyperparameter configurations sampled on every dataset.
+    path : str
+        The path of the compiled file, the mapping is only compiled in memory if None.
+
+    Returns:
+    --------
+    table : Dict[str, np.ndarray]
+        The compiled mapping, see load_hyper_table.
+    """
+    datasets = list(mapping.keys())
+    blocks = [np.asarray(mapping[dataset], dtype=np.int32) for dataset in datasets]
+    width = max((block.shape[1] for block in blocks if block.ndim == 2), default=0)
+    if any(block.size and (block.ndim != 2 or block.shape[1] != width) for block in blocks):
+        raise ValueError("All hyperparameter configurations need the same number of values.")
+    blocks = [block.reshape(-1, width) if block.size else np.zeros((0, width), dtype=np.int32) for block in blocks]
+    offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([block.shape[0] for block in blocks])
+    hypers = np.concatenate(blocks) if blocks else np.zeros((0, 0), dtype=np.int32)
+    if path is not None:
+        # write to a temporary file of this job first, so concurrent jobs never read or replace a half written file
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                np.savez(file, datasets=np.array(datasets, dtype=str), offsets=offsets, hypers=hypers)
+            # mkstemp creates the file only readable by the owner, use the permissions of a normally created file
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temporary_path, 0o666 & ~umask)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    return split_hyper_table(datasets, offsets, hypers)
+
+
+def load_hyper_table(path: str) -> Dict[str, np.ndarray]:
+    """
+    Function to load a mapping compiled by compile_hyper_table.
+
+    Parameters:
+    -----------
+    path : str
+        The path of the compiled file.
+
+    Returns:
+    --------
+    table : Dict[str, np.ndarray]
+        The hyperparameter configurations of every dataset, views on one int32 array shaped
+        hyperparameter x value.
+    """
+    with np.load(path) as file:
+        return split_hyper_table(file["datasets"].tolist(), file["offsets"], file["hypers"])
+
+
+def split_hyper_table(datasets: List[str], offsets: np.ndarray, hypers: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Returns the views on the configurations of every dataset.
+    """
+    # the views must not change the shared array
+    hypers.flags.writeable = False
+    return {dataset: hypers[offsets[index]:offsets[index + 1]] for index, dataset in enumerate(datasets)}
@@ -5,6 +5,7 @@ import os
 from omegaconf import OmegaConf
 import multiprocessing as mp
 from enum import Enum
+from .hyper_table import compile_hyper_table, load_hyper_table
 
 class PANDAS_STACK_ORIENTATION(Enum):
     """
@@ -15,6 +16,25 @@ class PANDAS_STACK_ORIENTATION(Enum):
     VERTICAL = 0
 
 
+# the data loader of a worker process, set once by init_load_worker
+_worker_loader = None
+
+
+def init_load_worker(loader: "DataLoader") -> None:
+    """
+    Initializer for pools which load frames, the loader is only sent once to every worker.
+    """
+    global _worker_loader
+    _worker_loader = loader
+
+
+def load_worker(path: str) -> Tuple[str, pd.DataFrame]:
+    """
+    Loads a single dataframe in a worker of a pool initialized with init_load_worker.
+    """
+    return _worker_loader.load_single_df(path)
+
+
 class DataLoader:
 
     def __init__(self, config_path="/home/h9/elru535b/scratch/elru535b-workspace/Data-Mining/remake/config/data.yaml") -> None:
@@ -38,10 +58,8 @@ class DataLoader:
             self.done_workload = pd.read_csv(self.config["workload"])
         else:
             raise FileNotFoundError("The done_workload file does not exist.")
-        if os.path.exists(self.config["hyperparameter"]):
-            self.hyperparameter = OmegaConf.load(self.config["hyperparameter"])
-        else:
-            raise FileNotFoundError("The hyperparameter config file does not exist!")
+        self.hyperparameter = self.load_hyperparameter(self.config["hyperparameter"],
+                                                       self.config.get("hyperparameter_compiled", None))
         self.data_dir = self.config["data_dir"]
         self.columns = [
             "EXP_RANDOM_SEED",
@@ -52,6 +70,32 @@ class DataLoader:
             "EXP_TRAIN_TEST_BUCKET_SIZE",
         ]
 
+    @staticmethod
+    def load_hyperparameter(path: str, compiled_path: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Function to load the hyperparameter configurations of every dataset. The compiled
+        binary table is used if it is at least as new as the yaml file, otherwise the yaml file
+        is parsed and compiled to compiled_path for the next runs.
+
+        Parameters:
+        -----------
+        path : str
+            The path to the yaml file mapping datasets to hyperparameter configurations.
+        compiled_path : Optional[str]
+            The path to the compiled table, see data/hyper_table.py.
+
+        Returns:
+        --------
+        hyperparameter : Dict[str, np.ndarray]
+            The configurations of every dataset, shaped hyperparameter x value.
+        """
+        if compiled_path is not None and os.path.exists(compiled_path):
+            if not os.path.exists(path) or os.path.getmtime(compiled_path) >= os.path.getmtime(path):
+                return load_hyper_table(compiled_path)
+        if not os.path.exists(path):
+            raise FileNotFoundError("The hyperparameter config file does not exist!")
+        return compile_hyper_table(OmegaConf.to_container(OmegaConf.load(path)), compiled_path)
+
     def get_strategies(self) -> List[str]:
         """
         Function to get all strategies described in the config file.
@@ -115,7 +159,8 @@ class DataLoader:
         """
         return path.split("/")[-3], pd.merge(pd.read_csv(path), self.done_workload)
 
-    def load_data_for_metric_dataset(self, metric:str, dataset:str) -> Tuple[List[str], List[pd.DataFrame]] | Tuple[None, None]:
+    def load_data_for_metric_dataset(self, metric:str, dataset:str, parallel: bool = True,
+                                     pool=None) -> Tuple[List[str], List[pd.DataFrame]] | Tuple[None, None]:
         """
         Function to load all files for a metric on a data set.
         Parameters:
@@ -124,6 +169,11 @@ class DataLoader:
             A metric.
         dataset : str
             A dataset.
+        parallel : bool
+            Specifies whether the files are loaded with a pool, must be False inside of pool workers.
+        pool : mp.Pool
+            A long-lived pool initialized with init_load_worker the files are loaded with. A
+            pool is only created for this call if parallel is set and no pool is given.
 
         Returns:
         --------
@@ -137,13 +187,18 @@ class DataLoader:
                  for strategy in self.get_strategies()]
         if not all([os.path.exists(path) for path in paths]):
             return None, None
-        with mp.Pool(mp.cpu_count()) as pool:
-            results = pool.map(self.load_single_df, paths)
-        pool.close()
+        if pool is not None:
+            results = pool.map(load_worker, paths)
+        elif parallel:
+            with mp.Pool(mp.cpu_count()) as pool:
+                results = pool.map(self.load_single_df, paths)
+            pool.close()
+        else:
+            results = list(map(self.load_single_df, paths))
         results = sorted(results, key=lambda x: x[0])
         return list(map(lambda x: x[0], results)), list(map(lambda x: x[1], results))
 
-    def get_hyperparameter_for_dataset(self, dataset:str) -> List[Tuple[int, int, int, int, int, int]]:
+    def get_hyperparameter_for_dataset(self, dataset:str) -> np.ndarray:
         """
 
         Parameters:
@@ -153,7 +208,8 @@ class DataLoader:
 
         Returns:
         --------
-        List[Tuple[int, int, int, int, int, int]]
+        hypers : np.ndarray
+            A read-only view on the configurations, shaped hyperparameter x value.
         """
         return self.hyperparameter[dataset]
 
@@ -179,3 +235,40 @@ class DataLoader:
         else:
             filtered_df = filtered_df[:-9]
         return frame[0], filtered_df
+
+    def get_rows(self, frame: pd.DataFrame, hypers: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Function to extract the rows of all hyperparameter configurations from a dataframe at
+        once. The configurations are joined on the hyperparameter columns, like in get_row
+        only configurations with exactly one matching row are valid.
+
+        Parameters:
+        -----------
+        frame : pd.DataFrame
+            The frame of a strategy.
+        hypers : List[List[int]]
+            The hyperparameter configurations.
+
+        Returns:
+        --------
+        rows : np.ndarray
+            The rows without the last 9 columns, shaped hyperparameter x AL-cycle. Rows of
+            invalid configurations are zero.
+        valid : np.ndarray
+            Marks the configurations with exactly one matching row.
+        """
+        values = frame.to_numpy()[:, :-9]
+        keys = frame[self.columns].reset_index(drop=True)
+        keys["_row"] = np.arange(frame.shape[0])
+        wanted = pd.DataFrame(np.asarray(hypers, dtype=np.int64).reshape(-1, len(self.columns)),
+                              columns=self.columns)
+        wanted["_hyper"] = np.arange(len(wanted))
+        joined = wanted.merge(keys, on=self.columns, how="inner")
+        hyper_positions = joined["_hyper"].to_numpy()
+        counts = np.bincount(hyper_positions, minlength=len(wanted))
+        valid = counts == 1
+        # a valid configuration occurs exactly once in the join
+        unique = valid[hyper_positions]
+        rows = np.zeros((len(wanted), values.shape[1]), dtype=values.dtype)
+        rows[hyper_positions[unique]] = values[joined["_row"].to_numpy()[unique]]
+        return rows, valid
@@ -4,6 +4,7 @@ from typing import List
 from omegaconf import OmegaConf, dictconfig
 import csv
 from collections import defaultdict
+from data.hyper_table import compile_hyper_table
 
 def main() -> None:
     """
@@ -49,6 +50,8 @@ def get_dataset_to_hyper_dict() -> None:
         print(f"- {entry}")
     new_config = OmegaConf.create(final)
     OmegaConf.save(new_config, "../assets/dataset_hyper.yaml")
+    # the compiled table is what the DataLoader reads, parsing the yaml is slow
+    compile_hyper_table(final, "../assets/dataset_hyper.npz")
 
 
 def get_dataset_index():
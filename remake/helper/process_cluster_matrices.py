@@ -1,7 +1,9 @@
 from clustering.cpu.matrix import Matrix
+from clustering.cpu.partial import PARTIAL_VERSION, read_partial, write_partial
 import os
 import multiprocessing as mp
-from typing import List, Dict
+from typing import List, Dict, Tuple
+import numpy as np
 import pandas as pd
 import json
 
@@ -25,37 +27,169 @@ def read_single_result(result_path: str) -> pd.DataFrame:
     df = pd.read_csv(result_path, index_col=0)
     return df
 
-def read_all_results() -> Matrix:
+def load_result(result_path: str) -> Tuple[np.ndarray, List[str], Dict]:
     """
-    Function to read all results.
+    Function to read a binary partial or a numeric result csv of older runs.
 
     Parameters:
     -----------
-    None
+    result_path : str
+        The path to the partial or csv.
+
+    Returns:
+    --------
+    counts : np.ndarray
+        The co-occurrence counts, shaped label x label.
+    labels : List[str]
+        The strategies in the order of the rows and columns.
+    header : Dict
+        The provenance of the result.
+    """
+    if result_path.endswith(".npz"):
+        return read_partial(result_path)
+    df = read_single_result(result_path)
+    return df.to_numpy(dtype=np.int64), df.index.to_list(), {"version": PARTIAL_VERSION, "source": result_path}
+
+
+def reduce_partials(paths: List[str], labels: List[str] = None) -> Tuple[np.ndarray, List[str], Dict]:
+    """
+    Function to sum partial results. The partials are read one after another, so only the sum
+    and a single partial are in memory at once. Every partial has to contain exactly the same
+    strategies, they are reordered to the label order of the sum.
+
+    Parameters:
+    -----------
+    paths : List[str]
+        The paths to the partials or csv results.
+    labels : List[str]
+        The label order of the sum, the order of the first partial if None.
+
+    Returns:
+    --------
+    counts : np.ndarray
+        The summed co-occurrence counts, shaped label x label.
+    labels : List[str]
+        The strategies in the order of the rows and columns.
+    header : Dict
+        The provenance of every summed partial.
+    """
+    if not paths:
+        raise ValueError("There are no partials to reduce.")
+    total = None
+    sources: List[Dict] = []
+    for path in paths:
+        counts, part_labels, header = load_result(path)
+        if labels is None:
+            labels = part_labels
+        if len(set(part_labels)) != len(part_labels) or set(part_labels) != set(labels):
+            raise ValueError(f"The labels of {path} don't match the labels of the other partials.")
+        positions = {label: position for position, label in enumerate(part_labels)}
+        order = np.array([positions[label] for label in labels], dtype=np.intp)
+        if total is None:
+            total = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        total += counts[np.ix_(order, order)]
+        # partials of earlier reductions carry the provenance of their own inputs
+        sources.extend(header.get("sources", [header]))
+    return total, list(labels), {"version": PARTIAL_VERSION, "sources": sources}
+
+
+def _reduce_group(task: Tuple[List[str], List[str], str]) -> str:
+    """
+    Reduces a group of partials of the tree reduction into a new partial.
+    """
+    paths, labels, out_path = task
+    counts, labels, header = reduce_partials(paths, labels)
+    write_partial(out_path, counts, labels, header)
+    return out_path
+
+
+def tree_reduce(paths: List[str], work_dir: str, fan_in: int = 64,
+                num_workers: int = None) -> Tuple[np.ndarray, List[str], Dict]:
+    """
+    Function to sum thousands of partials. The partials are summed in groups of fan_in into
+    intermediate partials in work_dir, level by level until a single group remains. The
+    groups of a level are reduced in parallel, the intermediate partials of a level are removed
+    once the next level is done.
+
+    Parameters:
+    -----------
+    paths : List[str]
+        The paths to the partials or csv results.
+    work_dir : str
+        The directory for the intermediate partials.
+    fan_in : int
+        The maximal number of partials summed by one reduction.
+    num_workers : int
+        The number of processes, all cores if None.
+
+    Returns:
+    --------
+    counts : np.ndarray
+        The summed co-occurrence counts, shaped label x label.
+    labels : List[str]
+        The strategies in the order of the rows and columns.
+    header : Dict
+        The provenance of every summed partial.
+    """
+    if fan_in < 2:
+        raise ValueError("The fan in of the tree reduction must be at least 2.")
+    if not paths:
+        raise ValueError("There are no partials to reduce.")
+    os.makedirs(work_dir, exist_ok=True)
+    # the first partial fixes the label order of all reductions
+    labels = load_result(paths[0])[1]
+    level = 0
+    intermediate: List[str] = []
+    while len(paths) > fan_in:
+        tasks = [
+            (paths[start:start + fan_in], labels, os.path.join(work_dir, f"reduce_{level}_{start // fan_in}.npz"))
+            for start in range(0, len(paths), fan_in)
+        ]
+        with mp.Pool(num_workers) as pool:
+            reduced = pool.map(_reduce_group, tasks)
+        pool.close()
+        for path in intermediate:
+            os.remove(path)
+        paths = intermediate = reduced
+        level += 1
+    result = reduce_partials(paths, labels)
+    for path in intermediate:
+        os.remove(path)
+    return result
+
+
+def read_all_results(root: str = "../results/clust2", fan_in: int = 64) -> Matrix:
+    """
+    Function to read all results. The binary partials (partial_*.npz) of the runs are reduced
+    if there are any, else the numeric result csv files of older runs.
+
+    Parameters:
+    -----------
+    root : str
+        The directory containing the results of all jobs.
+    fan_in : int
+        The maximal number of partials summed by one reduction, see tree_reduce.
 
     Returns:
     --------
     matrix : Matrix
         A matrix object containing all combined values.
     """
-    root:str = "../results/clust2"
     result_path = "../results"
     if not os.path.exists(root):
         raise FileNotFoundError(f"Directory {root} does not exist.")
     if "init.txt" in os.listdir(root):
         os.remove(os.path.join(root, "init.txt"))
-    all_files = [os.path.join(root, file) for file in os.listdir(root) if file.split("_")[3] != "normalized"]
-    with mp.Pool(mp.cpu_count()) as pool:
-        results = pool.map(read_single_result, all_files)
-    pool.close()
-    merged_df = results[0]
-    labels: List[str] = merged_df.columns.to_list()[1:]
+    all_files = sorted(os.path.join(root, file) for file in os.listdir(root)
+                       if file.startswith("partial_") and file.endswith(".npz"))
+    if not all_files:
+        all_files = sorted(os.path.join(root, file) for file in os.listdir(root)
+                           if file.endswith(".csv") and "normalized" not in file.split("_"))
+    counts, labels, header = tree_reduce(all_files, os.path.join(root, "reduce"), fan_in)
+    print(f"Reduced {len(header['sources'])} results")
     print(labels)
-    for df in results[1:]:
-        merged_df += df
-    print(merged_df)
     matrix = Matrix(labels, result_path)
-    matrix.set_values(merged_df)
+    matrix.set_values(pd.DataFrame(index=labels, columns=labels, data=counts))
     return matrix
 
 
@@ -1,17 +1,26 @@
 from omegaconf import OmegaConf
 from data.loader import DataLoader
-from clustering.runner import ClusterRunner, MODE
+from clustering.runner import ClusterRunner, MODE, STACKED
 import sys
 import os
 
 # we have 93 metrices in the config file
-def main(index: int) -> None:
+def main(index: int, mode: MODE = MODE.CPU, stacked: STACKED = STACKED.SINGLE, streaming: bool = False,
+         resume: bool = False) -> None:
     """
 
     Parameters:
     -----------
     index : int
         The index of the metric file we want to run the calculation on.
+    mode : MODE
+        Whether the clustering runs on the CPU or with torch on the GPU.
+    stacked : STACKED
+        Whether the torch clustering stacks all hyperparameters of a dataset.
+    streaming : bool
+        Whether the CPU clustering streams chunks of hyperparameters through incremental estimators.
+    resume : bool
+        Whether the CPU clustering continues from the checkpoint of a killed run.
 
     Returns:
     --------
@@ -23,7 +32,7 @@ def main(index: int) -> None:
     # create the global DataLoader Object
     data = DataLoader()
     # create the cluster runner
-    runner = ClusterRunner(MODE.CPU, config, data)
+    runner = ClusterRunner(mode, config, data, stacked=stacked, streaming=streaming, resume=resume)
     # start running
     runner.run(index)
 
@@ -34,5 +43,15 @@ if __name__ == "__main__":
         index = int(sys.argv[1])
     else:
         exit("No parameter provided!")
-    print(f"Starting main with index {index}")
-    main(index)
\ No newline at end of file
+    # optional second parameter: cpu (default), cpu_stream, gpu or gpu_stacked
+    run_mode = sys.argv[2] if len(sys.argv) > 2 else "cpu"
+    # optional third parameter: resume, continues a killed CPU run from its checkpoint
+    resume = len(sys.argv) > 3 and sys.argv[3] == "resume"
+    print(f"Starting main with index {index} in mode {run_mode}")
+    main(
+        index,
+        MODE.CPU if run_mode.startswith("cpu") else MODE.GPU,
+        STACKED.DATASET if run_mode == "gpu_stacked" else STACKED.SINGLE,
+        run_mode == "cpu_stream",
+        resume,
+    )
\ No newline at end of file
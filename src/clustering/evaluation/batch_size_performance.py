@@ -6,6 +6,8 @@ import numpy as np
 import os
 import matplotlib.pyplot as plt
 
+from datasets.batch_sizes import BATCH_SIZES, split_by_batch_size
+
 
 class BatchSizePerformance:
 
@@ -25,7 +27,7 @@ class BatchSizePerformance:
 
     def generate_plot_for(self, dataset: str, metric: str):
         categorized = {}
-        for batch_size in [1, 5, 10]:
+        for batch_size in BATCH_SIZES:
             categorized[batch_size] = []
 
         # Calculate average slope for a given dataset and metric
@@ -35,8 +37,8 @@ class BatchSizePerformance:
             # Load dataframe
             try:
                 df = pd.merge(pd.read_csv(path_to_metric), self.hyperparameters, on="EXP_UNIQUE_ID")
-                for batch_size in [1, 5, 10]:
-                    dummy: pd.DataFrame = df.loc[df["EXP_BATCH_SIZE"] == batch_size].iloc[:, :-9]
+                for batch_size, part in split_by_batch_size(df).items():
+                    dummy: pd.DataFrame = part.iloc[:, :-9]
                     # dummy.to_csv(f'{self.destination}/{metric}_{strategy}_{batch_size}.csv', index=False)
                     time_series = dummy.to_numpy().tolist()
                     time_series = time_series if time_series is not None else []
@@ -47,7 +49,7 @@ class BatchSizePerformance:
 
         to_plot = []
         legend = []
-        for key in [1, 5, 10]:
+        for key in BATCH_SIZES:
             # Calculate average time series
             time_series = categorized[key]
             to_plot.append([sum(elements) / len(time_series) for elements in zip(*time_series)])
@@ -84,7 +86,7 @@ class BatchSizePerformance:
 
     def generate_all_average(self, metric: str):
         categorized = {}
-        for batch_size in [1, 5, 10]:
+        for batch_size in BATCH_SIZES:
             categorized[batch_size] = []
 
         # Calculate average slope for a given metric
@@ -95,8 +97,8 @@ class BatchSizePerformance:
                 # Load dataframe
                 try:
                     df = pd.merge(pd.read_csv(path_to_metric), self.hyperparameters, on="EXP_UNIQUE_ID")
-                    for batch_size in [1, 5, 10]:
-                        dummy: pd.DataFrame = df.loc[df["EXP_BATCH_SIZE"] == batch_size].iloc[:, :-9]
+                    for batch_size, part in split_by_batch_size(df).items():
+                        dummy: pd.DataFrame = part.iloc[:, :-9]
                         # dummy.to_csv(f'{self.destination}/{metric}_{strategy}_{batch_size}.csv', index=False)
                         time_series = dummy.to_numpy().tolist()
                         time_series = time_series if time_series is not None else []
@@ -107,7 +109,7 @@ class BatchSizePerformance:
 
         to_plot = []
         legend = []
-        for key in [1, 5, 10]:
+        for key in BATCH_SIZES:
             # Calculate average time series
             time_series = categorized[key]
             to_plot.append([sum(elements) / len(time_series) for elements in zip(*time_series)])
@@ -1,3 +1,4 @@
+from datasets.batch_sizes import BATCH_SIZES
 from datasets.loader import Loader
 from typing import List
 import numpy as np
@@ -96,9 +97,9 @@ class Derivation:
         return average_time_series
 
     def save_as_one(self, strategy: str, metric: str, directory: str):
-        fig, axes = plt.subplots(nrows=1, ncols=3, figsize=(12, 4))
+        fig, axes = plt.subplots(nrows=1, ncols=len(BATCH_SIZES), figsize=(4 * len(BATCH_SIZES), 4))
 
-        for index, batch_size in enumerate([1, 5, 10]):
+        for index, batch_size in enumerate(BATCH_SIZES):
             average = []
             for dataset in self.data.get_dataset_names():
                 data = self.load_diff(dataset=dataset, strategy=strategy, metric=metric, batch_size=batch_size)
@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import os
 import sys
 
@@ -6,18 +8,35 @@ import json
 
 import numpy as np
 
+from collections import OrderedDict
 from typing import List, Callable, Tuple, Dict
 
+from datasets.batch_sizes import BATCH_SIZES, split_by_batch_size
+from datasets.performance_table import PerformanceTable
+from datasets.scoring import SCORERS, Scorer, as_scorer, as_series_matrix
+
 
 class JsonAll:
 
-    def __init__(self, loader_directory: str, destination: str):
+    def __init__(self, loader_directory: str, destination: str, cache_bytes: int = 2 ** 30):
         self.source = loader_directory
         self.destination = destination
 
         self.hyperparameters = self.get_hyperparameters()
         self.hyperparameters["EXP_UNIQUE_ID"] = self.hyperparameters["EXP_UNIQUE_ID"].astype(int)
 
+        # Merged frames by (strategy, dataset, metric) with the mtime of their file and their size in bytes, the least
+        # recently used frames are evicted once the cached frames exceed cache_bytes
+        self.frame_cache: OrderedDict[Tuple[str, str, str], Tuple[pd.DataFrame, int, int]] = OrderedDict()
+        self.cache_bytes = cache_bytes
+        self.cached_bytes = 0
+
+        # Directory listings by path with the mtime of the directory, a listing is scanned again once its mtime changes
+        self.listings: Dict[str, Tuple[int, List[str], List[str]]] = {}
+
+        # Table of the rankings gen_performance_json was last called for
+        self.performance_table: PerformanceTable | None = None
+
     @staticmethod
     def get_subdirectories(path: str) -> List[str]:
         return sorted([entry.name for entry in os.scandir(path) if entry.is_dir()])
@@ -26,16 +45,36 @@ class JsonAll:
     def get_files(path: str) -> List[str]:
         return sorted([entry.name[:-7] for entry in os.scandir(path) if entry.is_file()])
 
+    @staticmethod
+    def mtime_ns(path: str) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return -1
+
+    # Return the sorted subdirectories and files of a directory, only scanned again if the directory changed
+    def scan(self, path: str) -> Tuple[List[str], List[str]]:
+        mtime = os.stat(path).st_mtime_ns
+        listing = self.listings.get(path)
+        if listing is None or listing[0] != mtime:
+            with os.scandir(path) as entries:
+                entries = list(entries)
+            listing = (mtime,
+                       sorted([entry.name for entry in entries if entry.is_dir()]),
+                       sorted([entry.name[:-7] for entry in entries if entry.is_file()]))
+            self.listings[path] = listing
+        return listing[1], listing[2]
+
     # Method that returns all possible AL strategies
     def get_all_strategies(self):
-        return self.get_subdirectories(self.source)
+        return self.scan(self.source)[0]
 
     # Method that returns all datasets
     def get_all_datasets(self):
         datasets = []
         for strategy in self.get_all_strategies():
             path_to_datasets = f"{self.source}/{strategy}"
-            datasets.extend(self.get_subdirectories(path_to_datasets))
+            datasets.extend(self.scan(path_to_datasets)[0])
         return sorted(list(set(datasets)))
 
     # Method that return all possible metrics for a dataset
@@ -44,7 +83,7 @@ class JsonAll:
         for strategy in self.get_all_strategies():
             path_to_metric = f"{self.source}/{strategy}/{dataset}"
             try:
-                metrics.extend(self.get_files(path_to_metric))
+                metrics.extend(self.scan(path_to_metric)[1])
             except FileNotFoundError:
                 pass
         return sorted(list(set(metrics)))
@@ -52,11 +91,12 @@ class JsonAll:
     # Method that return all possible metrics there are
     def get_all_metrics(self):
         metrics = []
+        datasets = self.get_all_datasets()
         for strategy in self.get_all_strategies():
-            for dataset in self.get_all_datasets():
+            for dataset in datasets:
                 path_to_metric = f"{self.source}/{strategy}/{dataset}"
                 try:
-                    metrics.extend(self.get_files(path_to_metric))
+                    metrics.extend(self.scan(path_to_metric)[1])
                 except FileNotFoundError:
                     pass
         return sorted(list(set(metrics)))
@@ -69,8 +109,32 @@ class JsonAll:
     def remove_nan_rows(data_frame: pd.DataFrame) -> pd.DataFrame:
         return data_frame.dropna(subset=data_frame.columns[:-1], how="all")
 
-    # Load a single CSV file
+    # Load a single CSV file merged with the hyperparameters. The frame is cached as long as its file is unchanged, it is
+    # shared between the calls and must not be modified
     def load_single_csv(self, strategy: str, dataset: str, metric: str) -> pd.DataFrame:
+        key = (strategy, dataset, metric)
+        mtime = self.mtime_ns(f"{self.source}/{strategy}/{dataset}/{metric}.csv.xz")
+        cached = self.frame_cache.get(key)
+        if cached is not None:
+            if cached[1] == mtime:
+                self.frame_cache.move_to_end(key)
+                return cached[0]
+            # The file changed since it was cached
+            del self.frame_cache[key]
+            self.cached_bytes -= cached[2]
+
+        data_frame = self.read_single_csv(strategy, dataset, metric)
+        num_bytes = int(data_frame.memory_usage(deep=True).sum())
+        while self.frame_cache and self.cached_bytes + num_bytes > self.cache_bytes:
+            _, (_, _, evicted_bytes) = self.frame_cache.popitem(last=False)
+            self.cached_bytes -= evicted_bytes
+        if num_bytes <= self.cache_bytes:
+            self.frame_cache[key] = (data_frame, mtime, num_bytes)
+            self.cached_bytes += num_bytes
+        return data_frame
+
+    # Read and merge a single CSV file without the cache
+    def read_single_csv(self, strategy: str, dataset: str, metric: str) -> pd.DataFrame:
         path_to_metric = f"{self.source}/{strategy}/{dataset}/{metric}.csv.xz"
         try:
             return pd.merge(self.remove_nan_rows(pd.read_csv(path_to_metric)), self.hyperparameters, on="EXP_UNIQUE_ID")
@@ -86,34 +150,82 @@ class JsonAll:
             print(f"Could not find {path_to_metric}. Returning empty dataframe instead")
             return pd.DataFrame()
 
-    def calculate_score_for(self, dataset: str, batch_size: int, metric: str, score: Callable):
-
-        scores = []
+    def calculate_score_for(self, dataset: str, batch_size: int, metric: str, score: Scorer | Callable):
+        return self.calculate_scores_for(dataset, metric, score, [batch_size])[batch_size]
+
+    # Like calculate_score_for for several batch sizes at once, every file is only loaded and partitioned once
+    def calculate_scores_for(self, dataset: str, metric: str, score: Scorer | Callable,
+                             batch_sizes: List[int] = BATCH_SIZES) -> Dict[int, List[Tuple[str, float]]]:
+        return self.calculate_multi_scores_for(dataset, metric, [score], batch_sizes)[0]
+
+    # Average score of every strategy for several scorers and batch sizes. Every scorer scores all series of a file in
+    # one matrix operation. Scorers which need a baseline get the average series of baseline_strategy
+    def calculate_multi_scores_for(self, dataset: str, metric: str, scores: List[Scorer | Callable | str],
+                                   batch_sizes: List[int] = BATCH_SIZES,
+                                   baseline_strategy: str = "ALIPY_RANDOM") -> List[Dict[int, List[Tuple[str, float]]]]:
+        scorers = [as_scorer(score) for score in scores]
+        results = [{batch_size: [] for batch_size in batch_sizes} for _ in scorers]
+        baselines = {batch_size: None for batch_size in batch_sizes}
+        if any(scorer.needs_baseline for scorer in scorers):
+            baselines = self.get_baselines(dataset, metric, baseline_strategy, batch_sizes)
 
         for strategy in self.get_all_strategies():
             try:
                 df = self.load_single_csv(strategy=strategy, dataset=dataset, metric=metric)
-                df = df.loc[df["EXP_BATCH_SIZE"] == batch_size]
-                df = df.iloc[:, :-9].dropna(axis=1)
-
-                as_numpy = df.to_numpy()
-                if len(as_numpy) > 0:
-                    try:
-                        strategy_average = sum([score(series) for series in as_numpy]) / len(as_numpy)
-                        scores.append((strategy, strategy_average))
-                    except TypeError:
-                        print(f"Datatype of {strategy}, {dataset}, {metric}: {as_numpy.dtype}")
-                        scores.append((strategy, 0))
-                else:
-                    scores.append((strategy, 0))
-
+                parts = split_by_batch_size(df, batch_sizes)
             except FileNotFoundError:
                 print(f"File for {strategy}/{dataset}/{metric} not found. Should not get triggered")
-                scores.append((strategy, 0))
+                for result in results:
+                    for batch_size in batch_sizes:
+                        result[batch_size].append((strategy, 0))
+                continue
             except KeyError:
                 print(f"KeyError. File for {strategy}/{dataset}/{metric} not found")
+                continue
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+            for batch_size, df in parts.items():
+                as_numpy = df.iloc[:, :-9].dropna(axis=1).to_numpy()
+                if len(as_numpy) == 0:
+                    for result in results:
+                        result[batch_size].append((strategy, 0))
+                    continue
+
+                try:
+                    series = as_series_matrix(as_numpy)
+                except TypeError:
+                    print(f"Datatype of {strategy}, {dataset}, {metric}: {as_numpy.dtype}")
+                    for result in results:
+                        result[batch_size].append((strategy, 0))
+                    continue
+
+                for scorer, result in zip(scorers, results):
+                    try:
+                        # sum() adds the scores in the order of the rows like before
+                        strategy_average = sum(scorer.score(series, baselines[batch_size]).tolist()) / len(series)
+                        result[batch_size].append((strategy, strategy_average))
+                    except (TypeError, ValueError):
+                        print(f"Could not score {strategy}, {dataset}, {metric} with {scorer.name}")
+                        result[batch_size].append((strategy, 0))
+
+        return [{batch_size: sorted(result[batch_size], key=lambda x: x[1], reverse=True) for batch_size in batch_sizes}
+                for result in results]
+
+    # Average time series of a strategy for every batch size, None if the strategy has no numeric series
+    def get_baselines(self, dataset: str, metric: str, strategy: str,
+                      batch_sizes: List[int] = BATCH_SIZES) -> Dict[int, np.ndarray | None]:
+        baselines = {batch_size: None for batch_size in batch_sizes}
+        try:
+            parts = split_by_batch_size(self.load_single_csv(strategy, dataset, metric), batch_sizes)
+        except KeyError:
+            return baselines
+        for batch_size, df in parts.items():
+            as_numpy = df.iloc[:, :-9].dropna(axis=1).to_numpy()
+            try:
+                if len(as_numpy) > 0:
+                    baselines[batch_size] = as_series_matrix(as_numpy).mean(axis=0)
+            except TypeError:
+                pass
+        return baselines
 
     def write_dataset_batch_size(self, score: Callable):
 
@@ -132,18 +244,38 @@ class JsonAll:
         if not os.path.exists(subdirectory):
             os.makedirs(subdirectory)
 
-        # Create dataset_batch-size-json
-        for batch_size in [1, 5, 10]:
-            result_dict = {}
-            for metric in self.get_all_metrics():
-                result_dict[metric] = self.calculate_score_for(dataset, batch_size, metric, score)
+        # Create dataset_batch-size-json, all batch sizes are scored together
+        result_dicts = {batch_size: {} for batch_size in BATCH_SIZES}
+        for metric in self.get_all_metrics():
+            for batch_size, result in self.calculate_scores_for(dataset, metric, score).items():
+                result_dicts[batch_size][metric] = result
+        for batch_size, result_dict in result_dicts.items():
             file_name = f"{self.destination}/dataset_batch_size/{dataset}_{batch_size}.json"
             with open(file_name, 'w') as f:
                 json.dump(result_dict, f)
 
-    @staticmethod
-    def score_integral(time_series: np.ndarray):
-        return np.sum(time_series)
+    # Sum of a time series, a scorer which sums all series of a file at once
+    score_integral = SCORERS["integral"]
+
+    # Like write_dataset_batch_size_for for several scorers, the files are only loaded once. The results of every scorer
+    # go to the directory 'dataset_batch_size_<name of the scorer>'
+    def write_dataset_batch_size_multi_for(self, dataset: str, scores: List[Scorer | Callable | str]):
+        scorers = [as_scorer(score) for score in scores]
+        for scorer in scorers:
+            subdirectory = f"{self.destination}/dataset_batch_size_{scorer.name}"
+            if not os.path.exists(subdirectory):
+                os.makedirs(subdirectory)
+
+        result_dicts = [{batch_size: {} for batch_size in BATCH_SIZES} for _ in scorers]
+        for metric in self.get_all_metrics():
+            for result_dict, results in zip(result_dicts, self.calculate_multi_scores_for(dataset, metric, scorers)):
+                for batch_size, result in results.items():
+                    result_dict[batch_size][metric] = result
+        for scorer, result_dict in zip(scorers, result_dicts):
+            for batch_size, metric_dict in result_dict.items():
+                file_name = f"{self.destination}/dataset_batch_size_{scorer.name}/{dataset}_{batch_size}.json"
+                with open(file_name, 'w') as f:
+                    json.dump(metric_dict, f)
 
     @staticmethod
     def get_dataset_names_from_json(directory):
@@ -155,22 +287,13 @@ class JsonAll:
         return dataset_names
 
     def gen_performance_json(self, directory: str):
-        result_dict = {}
-        for dataset in json_all.get_dataset_names_from_json(directory=directory):
-            for batch_size in [1, 5, 10]:
-                if batch_size not in result_dict:
-                    result_dict[batch_size] = {}
-                file_name = f"{directory}/{dataset}_{batch_size}.json"
-                with open(file_name, 'r') as file:
-                    try:
-                        data: Dict[str, List[Tuple[str, int]]] = json.load(file)
-                    except json.decoder.JSONDecodeError:
-                        data = {}
-                        print(file_name)
-                for strategy in data.keys():
-                    if dataset not in result_dict[batch_size]:
-                        result_dict[batch_size][dataset] = {}
-                    result_dict[batch_size][dataset][strategy] = data[strategy]
+        # Only rankings which are new or changed since the last call are read again
+        if self.performance_table is None or self.performance_table.directory != directory:
+            table_path = PerformanceTable.table_path_for(self.destination, directory)
+            self.performance_table = PerformanceTable(directory=directory, table_path=table_path)
+        datasets = list(dict.fromkeys(self.get_dataset_names_from_json(directory=directory)))
+        self.performance_table.update(datasets, skip_invalid=True)
+        result_dict = self.performance_table.average_performance(datasets)
 
         file_name = f"{self.destination}/average_performance.json"
         with open(file_name, 'w') as f:
@@ -1,11 +1,12 @@
-from collections import defaultdict
-
 import numpy as np
 import pandas as pd
 import json
 import os as os
 
+from datasets.batch_sizes import BATCH_SIZES, split_by_batch_size
+from datasets.cell_parser import CellKind, classify_cells
 from datasets.loader import Loader
+from datasets.performance_table import PerformanceTable
 from typing import List, Tuple, Dict
 
 
@@ -36,6 +37,12 @@ class TopK:
         self.data = Loader(base_dir=loader_directory, wanted_metrics=self.considered_metric)
         self.destination_directory = destination
 
+        # Table of all rankings in 'dataset_batch_size', the performance JSONs are built from it
+        ranking_directory = f"{destination}/dataset_batch_size"
+        self.performance_table = PerformanceTable(directory=ranking_directory,
+                                                  table_path=PerformanceTable.table_path_for(destination,
+                                                                                             ranking_directory))
+
     # Calculate for generally the best AL strategy for a given metric and save the result
     def calculate_best_strategy_for_metric(self):
 
@@ -45,7 +52,7 @@ class TopK:
             os.makedirs(subdirectory)
 
         for metric in self.considered_metric:
-            for batch_size in [1, 5, 10]:
+            for batch_size in BATCH_SIZES:
                 best_al_strats = {}
                 for dataset in self.data.get_dataset_names():
                     file_name = f"{self.destination_directory}/dataset_batch_size/{dataset}_{batch_size}.json"
@@ -72,7 +79,7 @@ class TopK:
         dicts = []
 
         for dataset in self.data.get_dataset_names():
-            for batch_size in [1, 5, 10]:
+            for batch_size in BATCH_SIZES:
                 file_name =\
                     f"{self.destination_directory}/best_strategy_for/best_strategy_for_{dataset}_{batch_size}.json"
 
@@ -104,7 +111,7 @@ class TopK:
             os.makedirs(subdirectory)
 
         for dataset in self.data.get_dataset_names():
-            for batch_size in [1, 5, 10]:
+            for batch_size in BATCH_SIZES:
                 result_dict = self.best_al_strategy(dataset=dataset, batch_size=batch_size)
 
                 file_name =\
@@ -135,75 +142,93 @@ class TopK:
     # For a given dataset and metric, return an ordered list of AL strategies, representing its goodness
     def get_top_k(self, dataset: str, metric: str, batch_size: int, k: int = 500, threshold: float = 1,
                   max_iterations: int = 50, epsilon: float = 0):
-        # Load data
-        time_series_list: List[np.ndarray] = []
-        strategy_names: List[str] = []
+        return self.get_top_k_for_batch_sizes(dataset, metric, [batch_size], k=k, threshold=threshold,
+                                              max_iterations=max_iterations, epsilon=epsilon)[batch_size]
+
+    # Like get_top_k for several batch sizes at once, every frame is only partitioned by batch size once
+    def get_top_k_for_batch_sizes(self, dataset: str, metric: str, batch_sizes: List[int] = BATCH_SIZES,
+                                  k: int = 500, threshold: float = 1, max_iterations: int = 50,
+                                  epsilon: float = 0) -> Dict[int, List[Tuple[str, float]]]:
+        strategy_names: Dict[int, List[str]] = {batch_size: [] for batch_size in batch_sizes}
+        score_list: Dict[int, List[np.ndarray]] = {batch_size: [] for batch_size in batch_sizes}
 
         for strategy in self.data.get_strategy_names():
             frame: pd.DataFrame = self.data.get_single_dataframe(strategy, dataset, metric)
-            vector: pd.DataFrame = frame.loc[frame["EXP_BATCH_SIZE"] == batch_size]
-            vector = vector.iloc[:, :-9].dropna(axis=1)
-
-            if not vector.empty:
-                time_series_list.extend(vector.to_numpy())
-                strategy_names.extend([strategy] * len(vector))
-
-        time_series = [list(arr) for arr in time_series_list]
-
-        def is_monotonic_increasing(input_series):
-            for i in range(1, len(input_series)):
-                if input_series[i] < input_series[i - 1] - epsilon:
-                    return False
-            return True
-
-        def check_floats_or_integers(input_series):
-            for element in input_series:
-                if not isinstance(element, (float, int)):
-                    return False
-            return True
-
-        def reaches_threshold(input_series):
-            if threshold == -1:
-                return True
-            for i in range(len(input_series)):
-                if i < (max_iterations - 1) and input_series[i] >= threshold:
-                    return True
-            return False
-
-        def calculate_score(input_series):
-            return sum(input_series)  # Use sum() to calculate the score
-
-        valid_series = []
-        for series, strategy in zip(time_series, strategy_names):
-            if not check_floats_or_integers(series):
-                self.unwanted.append(metric)
-
-            if check_floats_or_integers(series) and is_monotonic_increasing(series) and reaches_threshold(
-                    series):
-                valid_series.append((strategy, calculate_score(series)))
-
-        valid_series = sorted(valid_series, key=lambda x: x[1], reverse=True)  # Sort by score
-
-        if len(valid_series) <= k:
-            top_k_series = valid_series
-        else:
-            top_k_series = valid_series[:k]
-
-        average = defaultdict(int)
-        occurrences = defaultdict(int)
-
-        for dataset, score in top_k_series:
-            occurrences[dataset] += 1
-            average[dataset] += score
-
-        for dataset in average.keys():
-            average[dataset] /= occurrences[dataset]
 
-        average_list = [(dataset, score) for dataset, score in average.items()]
-
-        sorted_average_list = sorted(average_list, key=lambda x: x[1], reverse=True)
-
-        return sorted_average_list
+            for batch_size, vector in split_by_batch_size(frame, batch_sizes).items():
+                vector = vector.iloc[:, :-9].dropna(axis=1)
+
+                if vector.empty:
+                    continue
+
+                # Rows with lists or other strings are skipped, the metric is remembered once per row
+                as_numpy = vector.to_numpy()
+                numeric = TopK.numeric_rows(vector, as_numpy)
+                self.unwanted.extend([metric] * int(np.count_nonzero(~numeric)))
+
+                # Every strategy has its own number of complete AL cycles, so the rows are scored per strategy
+                series = as_numpy[numeric].astype(np.float64)
+                valid, scores = TopK.score_series(series, threshold, max_iterations, epsilon)
+                score_list[batch_size].append(scores[valid])
+                strategy_names[batch_size].extend([strategy] * int(np.count_nonzero(valid)))
+
+        ranking = {}
+        for batch_size in batch_sizes:
+            scores = np.concatenate(score_list[batch_size]) if score_list[batch_size] else np.zeros(0)
+            ranking[batch_size] = TopK.rank_strategies(np.array(strategy_names[batch_size], dtype=object), scores, k)
+        return ranking
+
+    # Check all series (one per row) at once: they must increase monotonically up to epsilon and reach the threshold
+    # before max_iterations, a threshold of -1 disables the threshold. The score of a series is its sum
+    @staticmethod
+    def score_series(series: np.ndarray, threshold: float = 1, max_iterations: int = 50,
+                     epsilon: float = 0) -> Tuple[np.ndarray, np.ndarray]:
+        # Compare each cycle with its predecessor minus epsilon, np.diff would round differently
+        valid = np.all(series[:, 1:] >= series[:, :-1] - epsilon, axis=1)
+        if threshold != -1:
+            valid &= np.any(series[:, :max(max_iterations - 1, 0)] >= threshold, axis=1)
+
+        # cumsum adds the cycles one after another like sum(), a plain row sum would sum pairwise
+        scores = np.cumsum(series, axis=1)[:, -1] if series.shape[1] else np.zeros(series.shape[0])
+        return valid, scores
+
+    # Take the k best scored series and average their scores per strategy, the best strategy comes first. Ties keep
+    # the order of the series
+    @staticmethod
+    def rank_strategies(strategies: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if 0 < k < scores.size:
+            # Only the series scoring at least as good as the k-th best one need to be sorted
+            kth = scores[np.argpartition(scores, scores.size - k)[scores.size - k]]
+            better = np.flatnonzero(scores > kth)
+            candidates = np.sort(np.concatenate([better, np.flatnonzero(scores == kth)[:k - better.size]]))
+        else:
+            candidates = np.arange(scores.size)
+        top_k = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+
+        # Group the top k series by strategy, the groups are ordered by their best series
+        codes, names = pd.factorize(strategies[top_k])
+        average = np.bincount(codes, weights=scores[top_k], minlength=len(names)) / \
+            np.bincount(codes, minlength=len(names))
+        order = np.argsort(-average, kind="stable")
+        return list(zip(names[order].tolist(), average[order].tolist()))
+
+    # Mark the rows of a frame that only contain Python floats or ints, cells with lists or other strings make a row
+    # invalid. Like checking every cell of vector.to_numpy() with isinstance(cell, (float, int)), numeric arrays only
+    # pass as float64: numpy integers, bools and float32 aren't Python numbers, so e.g. int64 frames are invalid
+    @staticmethod
+    def numeric_rows(vector: pd.DataFrame, as_numpy: np.ndarray = None) -> np.ndarray:
+        dtype = (vector.to_numpy() if as_numpy is None else as_numpy).dtype
+        if dtype != object:
+            return np.full(len(vector), issubclass(dtype.type, (float, int)), dtype=bool)
+
+        # Converted to objects, the cells of numeric columns are Python numbers
+        numeric = np.ones(len(vector), dtype=bool)
+        for column in vector.columns:
+            if pd.api.types.is_numeric_dtype(vector[column]):
+                continue
+            cells = classify_cells(vector[column].to_numpy())
+            numeric &= (cells.kinds == CellKind.NUMBER) & ~cells.is_string
+        return numeric
 
     # Do calculations of get_top_k(...) for all datasets and save the results
     def collect_top_k(self, k: int = 500, threshold: float = 1, epsilon: float = 0):
@@ -214,125 +239,45 @@ class TopK:
             os.makedirs(subdirectory)
 
         for dataset in self.data.get_dataset_names():
-            for batch_size in [1, 5, 10]:
-                result_dict = {}
-                for metric in self.considered_metric:
-                    result_dict[metric] = self.get_top_k(dataset, metric, batch_size=batch_size, k=k,
-                                                         threshold=threshold, epsilon=epsilon)
-
+            result_dicts = {batch_size: {} for batch_size in BATCH_SIZES}
+            for metric in self.considered_metric:
+                rankings = self.get_top_k_for_batch_sizes(dataset, metric, BATCH_SIZES, k=k, threshold=threshold,
+                                                          epsilon=epsilon)
+                for batch_size, ranking in rankings.items():
+                    result_dicts[batch_size][metric] = ranking
+
+            for batch_size, result_dict in result_dicts.items():
                 file_name = f"{self.destination_directory}/dataset_batch_size/{dataset}_{batch_size}.json"
                 with open(file_name, 'w') as f:
                     json.dump(result_dict, f)
 
-    def gen_average_performance_json(self):
-        result_dict = {}
-        for dataset in self.data.get_dataset_names():
-            for batch_size in [1, 5, 10]:
-                # Initialize result_dict[batch_size] as a dictionary if it doesn't exist
-                if batch_size not in result_dict:
-                    result_dict[batch_size] = {}
+    # Read the rankings of new or changed datasets into the performance table
+    def update_performance_table(self):
+        self.performance_table.update(self.data.get_dataset_names())
 
-                file_name = f"{self.destination_directory}/dataset_batch_size/{dataset}_{batch_size}.json"
-                with open(file_name, 'r') as file:
-                    top_k_data: Dict[str, List[Tuple[str, int]]] = json.load(file)
-
-                for strategy in top_k_data.keys():
-                    # Initialize result_dict[batch_size][dataset] as a dictionary if it doesn't exist
-                    if dataset not in result_dict[batch_size]:
-                        result_dict[batch_size][dataset] = {}
-
-                    result_dict[batch_size][dataset][strategy] = top_k_data[strategy]
+    def gen_average_performance_json(self):
+        self.update_performance_table()
+        result_dict = self.performance_table.average_performance(self.data.get_dataset_names())
 
         file_name = f"{self.destination_directory}/average_performance.json"
         with open(file_name, 'w') as f:
             json.dump(result_dict, f)
 
     def gen_performance_json(self):
-        # 1. For each strategy, batch_size and metric, find datasets they perform on the best
-
-        values = {}
-
-        for dataset in self.data.get_dataset_names():
-            # Add another dimension
-            if dataset not in values:
-                values[dataset] = {}
-
-            for batch_size in [1, 5, 10]:
-                # Add another dimension
-                if batch_size not in values[dataset]:
-                    values[dataset][batch_size] = {}
-
-                # Read CSV file
-                file_name = f"{self.destination_directory}/dataset_batch_size/{dataset}_{batch_size}.json"
-                with open(file_name, 'r') as file:
-                    data_dict: dict[str: list[str]] = json.load(file)
-
-                for metric in list(data_dict.keys()):
-                    # Add another dimension
-                    if metric not in values[dataset][batch_size]:
-                        values[dataset][batch_size][metric] = {}
-
-                    # Iterate over the AL strategies with their scores
-                    for index in range(len(data_dict[metric])):
-                        # Each dataset receives a score for a metric, batch_size and strategy
-                        values[dataset][batch_size][metric][data_dict[metric][index][0]] = \
-                            values[dataset][batch_size][metric].get(data_dict[metric][index][0], 0) + \
-                            data_dict[metric][index][1]
-
-        # Sort values: For a given batch-size, metric and strategy, what are some good datasets to use it on? (Good is
-        # relative as there might be other combinations of batch-size, metric and strategy that perform even better on
-        # those datasets)
-
-        sorted_datasets = {}
-
-        for dataset in values:
-            for batch_size in values[dataset]:
-                for metric in values[dataset][batch_size]:
-                    for strategy in values[dataset][batch_size][metric]:
-                        score = values[dataset][batch_size][metric][strategy]
-
-                        if batch_size not in sorted_datasets:
-                            sorted_datasets[batch_size] = {}
-                        if metric not in sorted_datasets[batch_size]:
-                            sorted_datasets[batch_size][metric] = {}
-                        if strategy not in sorted_datasets[batch_size][metric]:
-                            sorted_datasets[batch_size][metric][strategy] = []
-
-                        sorted_datasets[batch_size][metric][strategy].append((dataset, score))
-
-        # Sort the datasets by score in descending order
-        for batch_size in sorted_datasets:
-            for metric in sorted_datasets[batch_size]:
-                for strategy in sorted_datasets[batch_size][metric]:
-                    sorted_datasets[batch_size][metric][strategy] = sorted(
-                        sorted_datasets[batch_size][metric][strategy], key=lambda x: x[1], reverse=True
-                    )
+        # For each strategy, batch_size and metric, find datasets they perform on the best. Sorted: For a given
+        # batch-size, metric and strategy, what are some good datasets to use it on? (Good is relative as there might
+        # be other combinations of batch-size, metric and strategy that perform even better on those datasets)
+        self.update_performance_table()
+        sorted_datasets = self.performance_table.performance(self.data.get_dataset_names())
 
         file_name = f"{self.destination_directory}/performance.json"
         with open(file_name, 'w') as f:
             json.dump(sorted_datasets, f)
 
     def gen_top_k_performance_json(self, k: int):
-        with open(f"{self.destination_directory}/performance.json") as file:
-            data: dict = json.load(file)
-
-        results = {}
-        for batch_size, batch_data in data.items():
-            results[batch_size] = {}
-            for metric, strategies in batch_data.items():
-                results[batch_size][metric] = {}
-                for dataset in self.data.get_dataset_names():
-                    strategy_scores = []
-                    for strategy, values in strategies.items():
-                        for item in values:
-                            if item[0] == dataset:
-                                strategy_scores.append((strategy, item[1]))
-                    strategy_scores.sort(key=lambda x: x[1], reverse=True)
-                    top_strategies = strategy_scores[:k]
-                    for strategy, score in top_strategies:
-                        if strategy not in results[batch_size][metric]:
-                            results[batch_size][metric][strategy] = []
-                        results[batch_size][metric][strategy].append([dataset, score])
+        self.update_performance_table()
+        datasets = self.data.get_dataset_names()
+        results = PerformanceTable.top_k_performance(self.performance_table.performance(datasets), datasets, k)
 
         with open(f"{self.destination_directory}/top_k_performance.json", 'w') as f:
             json.dump(results, f)
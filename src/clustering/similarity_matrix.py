@@ -11,7 +11,8 @@ class SimilarityMatrix:
     """
 
     labels: List[str]
-    values: pd.DataFrame
+    matrix: np.ndarray
+    positions: Dict[str, int]
     filename: str
     directory: str = "cl_res"
 
@@ -33,9 +34,24 @@ class SimilarityMatrix:
             only the initialized object
         """
         self.labels = labels
-        self.values = pd.DataFrame(index=labels, columns=labels, data=0)
+        self.matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+        self.positions = {label: position for position, label in enumerate(labels)}
         self.filename = cluster_strategy_name
 
+    @property
+    def values(self) -> pd.DataFrame:
+        """
+        The matrix as a DataFrame with the labels as index and columns. The DataFrame is
+        built on every access, changes to it don't affect the matrix.
+        """
+        return pd.DataFrame(index=self.labels, columns=self.labels, data=self.matrix)
+
+    @values.setter
+    def values(self, values: pd.DataFrame) -> None:
+        self.labels = values.index.to_list()
+        self.matrix = values.to_numpy(copy=True)
+        self.positions = {label: position for position, label in enumerate(self.labels)}
+
     def __str__(self) -> str:
         """
         Prettyprint of the matrix.
@@ -67,17 +83,25 @@ class SimilarityMatrix:
         None
         """
 
+        # the last label of a strategy counts if it occurs more than once
         strategy_label: Dict[str, int] = {
             strategy: label for strategy, label in zip(strategies, labels)
         }
-        for strategy, label in strategy_label.items():
-            same_cluster: List[str] = [
-                key
-                for key, value in strategy_label.items()
-                if value == label and label >= 0
-            ]
-            for sim_label_strategy in same_cluster:
-                self.values.loc[strategy, sim_label_strategy] += 1
+        positions = np.array(
+            [self.positions[strategy] for strategy in strategy_label], dtype=np.intp
+        )
+        cluster_labels = np.array(list(strategy_label.values()), dtype=np.int64)
+
+        # noise (label -1) never counts as a shared cluster
+        clustered = cluster_labels >= 0
+        positions, cluster_labels = positions[clustered], cluster_labels[clustered]
+        if positions.size == 0:
+            return
+
+        _, cluster_index = np.unique(cluster_labels, return_inverse=True)
+        onehot = np.zeros((positions.size, cluster_index.max() + 1), dtype=np.int64)
+        onehot[np.arange(positions.size), cluster_index] = 1
+        self.matrix[np.ix_(positions, positions)] += onehot @ onehot.T
 
     def get_ordered_similarities(self) -> Dict[str, List[str]]:
         """
@@ -162,21 +186,15 @@ class SimilarityMatrix:
         return similarity_matrix
 
     def normalize(self) -> 'SimilarityMatrix':
-        n_rows, n_cols = self.values.shape
-
-        for row in range(n_rows):
-            diagonal_value = self.values.iloc[row, row]
-            for col in range(n_cols):
-                self.values.iloc[row, col] = self.values.iloc[row, col] / diagonal_value
+        # divide every row by its diagonal value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.matrix = self.matrix / np.diag(self.matrix)[:, np.newaxis]
 
         return self
 
     def as_2d_list(self):
-        # Remove the strategy names (index and column names) from the DataFrame
-        matrix = self.values.iloc[:, :].values
-
         # Convert any non-numeric values to floats
-        matrix = matrix.astype(float)
+        matrix = self.matrix.astype(float)
 
         # Convert the matrix to a 2D list
         matrix_list = matrix.tolist()
@@ -1,2 +1,8 @@
+from .cell_parser import *
+from .batch_sizes import *
+from .scoring import *
+from .performance_table import *
+from .frame_cache import *
+from .lazy_frames import *
 from .base_loader import *
 from .loader import *
@@ -2,12 +2,17 @@ from __future__ import annotations
 
 import os
 from abc import ABC
-from typing import Dict, List
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 from project_helper.Logger import Logger
 from side_handler.errors import NoSuchPathOrCSV
 
+from datasets.frame_cache import FrameCache
+
 
 class Base_Loader(ABC):
     """
@@ -20,8 +25,21 @@ class Base_Loader(ABC):
     datasets: List[str] = list()
     metrics: List[str] = list()
     data_dict: Dict[str, Dict[str, Dict[str, pd.DataFrame]]] = dict()
+    cache: FrameCache | None = None
+    hyper_index: Dict[Tuple[str, str, str], Dict[Tuple[int, ...], np.ndarray]]
+    # the hyperparameter columns which identify a data vector for the clustering
+    HYPER_COLUMNS: List[str] = [
+        "EXP_START_POINT",
+        "EXP_BATCH_SIZE",
+        "EXP_LEARNER_MODEL",
+        "EXP_TRAIN_TEST_BUCKET_SIZE",
+    ]
+    # assumed ratio between decoded frame size and .csv.xz file size before any file is read
+    XZ_EXPANSION_ESTIMATE: float = 10.0
 
-    def __init__(self, base_dir: str, wanted_metrics: List[str] = None) -> None:
+    def __init__(
+        self, base_dir: str, wanted_metrics: List[str] = None, cache_dir: str = None
+    ) -> None:
         """
         Init function.
 
@@ -29,6 +47,10 @@ class Base_Loader(ABC):
         -----------
         base : str
             should contain the string of the base directory.
+        wanted_metrics : List[str]
+            the metrics to load, all metrics if None
+        cache_dir : str
+            directory of the columnar frame cache, the cache is disabled if None
         -----------
 
         Returns:
@@ -37,11 +59,13 @@ class Base_Loader(ABC):
             only the initialized object
         """
         self.base_dir = base_dir
-        self.hyperparameters = pd.read_csv(
+        workload_path: str = (
             base_dir
             + "/"
             + list(filter(lambda x: "done_workload" in x, os.listdir(base_dir)))[0]
         )
+        self.workload_path = workload_path
+        self.hyperparameters = pd.read_csv(workload_path)
         self.strategies = sorted(
             [strat for strat in os.listdir(base_dir + "/") if strat[0].isupper()],
             key=str.lower,
@@ -60,6 +84,9 @@ class Base_Loader(ABC):
             key=str.lower,
         )
         self.wanted_metrics = wanted_metrics
+        self.hyper_index = dict()
+        if cache_dir is not None:
+            self.cache = FrameCache(cache_dir, base_dir, workload_path)
 
     @classmethod
     def list_metrics(self, base_dir: str):
@@ -105,8 +132,12 @@ class Base_Loader(ABC):
         NoSuchPathOrCSV Error
             if requestes path or csv doesn't exist
         """
+        # a fresh cache entry already holds the merged frame, skip xz decoding entirely
+        if self.cache is not None and self.cache.is_fresh(strategy, dataset, metric):
+            return self.cache.read(strategy, dataset, metric)
+
         try:
-            return pd.merge(
+            data_frame = pd.merge(
                 self.remove_nan_rows(
                     pd.read_csv(
                         self.base_dir
@@ -141,6 +172,88 @@ class Base_Loader(ABC):
             ))
             raise NoSuchPathOrCSV("Path or requestes CSV does not exist!")
 
+        if self.cache is not None:
+            self.cache.write(strategy, dataset, metric, data_frame)
+        return data_frame
+
+    def load_indexed_csv(
+        self, strategy: str, dataset: str, metric: str
+    ) -> pd.DataFrame:
+        """
+        Loads a single csv file like load_single_csv and builds its hyperparameter index.
+
+        Parameters:
+        -----------
+        strategy : str
+            the name of the strategy you want to have
+        dataset : str
+            the dataset you search in for the metric
+        metric : str
+            the metric name you want to have
+
+        Returns:
+        --------
+        dataframe : pd.DataFrame
+            the container with all data
+        """
+        data_frame = self.load_single_csv(strategy, dataset, metric)
+        self.hyper_index[(strategy, dataset, metric)] = self.build_hyper_index(
+            data_frame
+        )
+        return data_frame
+
+    def load_lazy_csv(
+        self, strategy: str, dataset: str, metric: str
+    ) -> pd.DataFrame:
+        """
+        Loads a single frame for the lazy mode like load_indexed_csv. There is no end of
+        the loading in the lazy mode, so the manifest of the frame cache is saved after
+        every frame to make the written frames available to later runs.
+
+        Parameters:
+        -----------
+        strategy : str
+            the name of the strategy you want to have
+        dataset : str
+            the dataset you search in for the metric
+        metric : str
+            the metric name you want to have
+
+        Returns:
+        --------
+        dataframe : pd.DataFrame
+            the container with all data
+        """
+        data_frame = self.load_indexed_csv(strategy, dataset, metric)
+        if self.cache is not None:
+            self.cache.save_manifest()
+        return data_frame
+
+    def drop_hyper_index(self, strategy: str, dataset: str, metric: str) -> None:
+        """
+        Removes the hyperparameter index of a frame, e.g. after the frame was evicted.
+        """
+        self.hyper_index.pop((strategy, dataset, metric), None)
+
+    @classmethod
+    def build_hyper_index(
+        cls, data_frame: pd.DataFrame
+    ) -> Dict[Tuple[int, ...], np.ndarray]:
+        """
+        Function to map every hyperparameter tuple of a frame to its row positions.
+
+        Parameters:
+        -----------
+        data_frame : pd.DataFrame
+            the merged frame
+
+        Returns:
+        --------
+        index : Dict[Tuple[int, ...], np.ndarray]
+            the row positions for each tuple of the HYPER_COLUMNS values
+        """
+        return data_frame.groupby(cls.HYPER_COLUMNS, sort=False).indices
+
     def load_all_csv(self) -> None:
         """
         Function to read in all data files at once.
@@ -158,11 +271,13 @@ class Base_Loader(ABC):
             for dataset in self.datasets:
                 metric_file: Dict[str, pd.DataFrame] = dict()
                 for metric in self.metrics:
-                    metric_file[metric] = self.load_single_csv(
+                    metric_file[metric] = self.load_indexed_csv(
                         strategy, dataset, metric
                     )
                 dataset_metric[dataset] = metric_file.copy()
             self.data_dict[strategy] = dataset_metric.copy()
+        if self.cache is not None:
+            self.cache.save_manifest()
 
     def load_selected_metric_csv(self) -> None:
         """
@@ -181,11 +296,107 @@ class Base_Loader(ABC):
             for dataset in self.datasets:
                 metric_file: Dict[str, pd.DataFrame] = dict()
                 for metric in self.wanted_metrics:
-                    metric_file[metric] = self.load_single_csv(
+                    metric_file[metric] = self.load_indexed_csv(
                         strategy, dataset, metric
                     )
                 dataset_metric[dataset] = metric_file.copy()
             self.data_dict[strategy] = dataset_metric.copy()
+        if self.cache is not None:
+            self.cache.save_manifest()
+
+    def load_csv_parallel(
+        self, metrics: List[str], num_workers: int, max_inflight_bytes: int
+    ) -> None:
+        """
+        Function to read in the data files of the given metrics with a process pool.
+        Files are only submitted while the estimated size of the decoded but not yet
+        collected frames stays below max_inflight_bytes, at least one file is always
+        in flight.
+
+        Parameters:
+        -----------
+        metrics : List[str]
+            the metrics to load for every strategy and dataset
+        num_workers : int
+            the number of worker processes
+        max_inflight_bytes : int
+            the cap on the estimated bytes of decoded frames in flight
+
+        Returns:
+        --------
+        None
+        """
+        for strategy in self.strategies:
+            self.data_dict[strategy] = {dataset: dict() for dataset in self.datasets}
+
+        pending: deque[Tuple[str, str, str]] = deque(
+            (strategy, dataset, metric)
+            for strategy in self.strategies
+            for dataset in self.datasets
+            for metric in metrics
+        )
+        in_flight: Dict[Future, Tuple[Tuple[str, str, str], int, int]] = dict()
+        in_flight_bytes: int = 0
+        expansion: float = self.XZ_EXPANSION_ESTIMATE
+
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_load_worker,
+            initargs=(
+                self.base_dir,
+                self.hyperparameters,
+                None if self.cache is None else self.cache.cache_dir,
+                self.workload_path,
+            ),
+        ) as pool:
+            while pending or in_flight:
+                # submit as long as the memory budget allows it
+                while pending and len(in_flight) < 2 * num_workers:
+                    key = pending[0]
+                    file_size = self._file_size(*key)
+                    estimate = int(file_size * expansion)
+                    if in_flight and in_flight_bytes + estimate > max_inflight_bytes:
+                        break
+                    pending.popleft()
+                    in_flight[pool.submit(_load_worker, key)] = (key, file_size, estimate)
+                    in_flight_bytes += estimate
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    (strategy, dataset, metric), file_size, estimate = in_flight.pop(future)
+                    in_flight_bytes -= estimate
+                    try:
+                        data_frame, from_cache = future.result()
+                    except FileNotFoundError:
+                        raise NoSuchPathOrCSV("Path or requestes CSV does not exist!")
+                    if not from_cache:
+                        # keep the estimate conservative with the largest observed ratio
+                        expansion = max(
+                            expansion,
+                            data_frame.memory_usage(deep=True).sum() / max(file_size, 1),
+                        )
+                        if self.cache is not None:
+                            self.cache.write(strategy, dataset, metric, data_frame)
+                    self.data_dict[strategy][dataset][metric] = data_frame
+                    self.hyper_index[(strategy, dataset, metric)] = (
+                        self.build_hyper_index(data_frame)
+                    )
+
+        if self.cache is not None:
+            self.cache.save_manifest()
+
+    def _file_size(self, strategy: str, dataset: str, metric: str) -> int:
+        """
+        Returns the size of the file a frame will be read from, 0 if it doesn't exist.
+        """
+        if self.cache is not None and self.cache.is_fresh(strategy, dataset, metric):
+            path = self.cache.frame_path(strategy, dataset, metric)
+        else:
+            path = self.base_dir + "/" + strategy + "/" + dataset + "/" + metric + ".csv.xz"
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
 
     @staticmethod
     def remove_nan_rows(data_frame: pd.DataFrame) -> pd.DataFrame:
@@ -204,3 +415,61 @@ class Base_Loader(ABC):
         """
         data_frame = data_frame.dropna(subset=data_frame.columns[:-1], how="all")
         return data_frame
+
+
+# state of a loading worker process, set once by the pool initializer
+_worker_state: Dict[str, object] = dict()
+
+
+def _init_load_worker(
+    base_dir: str,
+    hyperparameters: pd.DataFrame,
+    cache_dir: str | None,
+    workload_path: str,
+) -> None:
+    """
+    Initializer of the loading worker processes, keeps the workload in the worker so it
+    is only pickled once per process.
+    """
+    _worker_state["base_dir"] = base_dir
+    _worker_state["hyperparameters"] = hyperparameters
+    _worker_state["cache"] = (
+        None if cache_dir is None else FrameCache(cache_dir, base_dir, workload_path)
+    )
+
+
+def _load_worker(key: Tuple[str, str, str]) -> Tuple[pd.DataFrame, bool]:
+    """
+    Loads a single merged frame inside a worker process.
+
+    Parameters:
+    -----------
+    key : Tuple[str, str, str]
+        the strategy, dataset and metric to load
+
+    Returns:
+    --------
+    dataframe, from_cache : Tuple[pd.DataFrame, bool]
+        the merged frame and whether it was read from the frame cache
+    """
+    strategy, dataset, metric = key
+    cache: FrameCache | None = _worker_state["cache"]
+    if cache is not None and cache.is_fresh(strategy, dataset, metric):
+        return cache.read(strategy, dataset, metric), True
+    data_frame = pd.merge(
+        Base_Loader.remove_nan_rows(
+            pd.read_csv(
+                _worker_state["base_dir"]
+                + "/"
+                + strategy
+                + "/"
+                + dataset
+                + "/"
+                + metric
+                + ".csv.xz"
+            )
+        ),
+        _worker_state["hyperparameters"],
+        on="EXP_UNIQUE_ID",
+    )
+    return data_frame, False
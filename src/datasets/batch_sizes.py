@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# The batch sizes every evaluation is done for
+BATCH_SIZES: List[int] = [1, 5, 10]
+
+
+def split_by_batch_size(
+    data_frame: pd.DataFrame, batch_sizes: List[int] = BATCH_SIZES
+) -> Dict[int, pd.DataFrame]:
+    """
+    Function to partition a frame by EXP_BATCH_SIZE in a single pass, instead of filtering
+    the whole frame again for every batch size. Every part keeps the order of the rows.
+
+    Parameters:
+    -----------
+    data_frame : pd.DataFrame
+        the frame, it needs an EXP_BATCH_SIZE column
+    batch_sizes : List[int]
+        the batch sizes to return a part for
+
+    Returns:
+    --------
+    parts : Dict[int, pd.DataFrame]
+        the rows of every batch size, empty if a batch size doesn't occur
+    """
+    positions = data_frame.groupby("EXP_BATCH_SIZE", sort=False).indices
+    missing = np.zeros(0, dtype=np.intp)
+    return {
+        batch_size: data_frame.iloc[positions.get(batch_size, missing)]
+        for batch_size in batch_sizes
+    }
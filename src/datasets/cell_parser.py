@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import ast
+import re
+from enum import IntEnum
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class CellKind(IntEnum):
+    """
+    The kinds of cells in the raw result files.
+    """
+
+    NUMBER = 0
+    NAN = 1
+    EMPTY_LIST = 2
+    LIST = 3
+    MALFORMED = 4
+    OTHER = 5
+
+
+class ClassifiedCells(NamedTuple):
+    """
+    The result of classify_cells, one entry per cell.
+
+    kinds : np.ndarray
+        the CellKind of every cell as int8
+    values : np.ndarray
+        the float64 value of numbers and the mean of lists, NaN otherwise
+    is_string : np.ndarray
+        marks cells which are stored as strings
+    is_integer : np.ndarray
+        marks numbers which are integer literals
+    """
+
+    kinds: np.ndarray
+    values: np.ndarray
+    is_string: np.ndarray
+    is_integer: np.ndarray
+
+
+INTEGER_PATTERN = r"[+-]?(?:0+|[1-9][0-9]*)"
+FLOAT_PATTERN = r"[+-]?(?:(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?|[0-9]+[eE][+-]?[0-9]+)"
+
+INTEGER_RE = re.compile(INTEGER_PATTERN)
+NUMBER_RE = re.compile(rf"{FLOAT_PATTERN}|{INTEGER_PATTERN}")
+EMPTY_LIST_RE = re.compile(r"\[\s*\]")
+LIST_RE = re.compile(rf"\[\s*(?:{FLOAT_PATTERN}|{INTEGER_PATTERN})(?:\s*,\s*(?:{FLOAT_PATTERN}|{INTEGER_PATTERN}))*\s*\]")
+
+
+def classify_cells(cells: np.ndarray | pd.Series) -> ClassifiedCells:
+    """
+    Function to classify all cells of a column in a single pass. Every distinct string is
+    only looked at once, plain numbers and flat lists of numbers are recognized by regular
+    expressions and only the remaining strings are handed to ast.literal_eval. Strings
+    containing 'nan' count as NaN like in the raw result files.
+
+    Parameters:
+    -----------
+    cells : np.ndarray | pd.Series
+        the cells of a column
+
+    Returns:
+    --------
+    classified : ClassifiedCells
+        the kind, value and flags of every cell
+    """
+    cells = np.asarray(cells)
+    num_cells = len(cells)
+
+    # Numeric columns need no parsing
+    if cells.dtype.kind in "biuf":
+        kinds = np.where(pd.isna(cells), CellKind.NAN, CellKind.NUMBER).astype(np.int8)
+        return ClassifiedCells(
+            kinds,
+            cells.astype(np.float64),
+            np.zeros(num_cells, dtype=bool),
+            np.full(num_cells, cells.dtype.kind in "biu"),
+        )
+
+    # Classify every distinct cell only once, the sentinel code -1 marks missing cells
+    codes, uniques = pd.factorize(cells, use_na_sentinel=True)
+    uniques = np.asarray(uniques, dtype=object)
+    num_uniques = len(uniques)
+
+    kinds = np.full(num_uniques + 1, CellKind.NAN, dtype=np.int8)
+    values = np.full(num_uniques + 1, np.nan, dtype=np.float64)
+    is_string = np.zeros(num_uniques + 1, dtype=bool)
+    is_integer = np.zeros(num_uniques + 1, dtype=bool)
+
+    strings = np.array([isinstance(value, str) for value in uniques], dtype=bool)
+    is_string[:num_uniques] = strings
+
+    # Cells which are no strings are either numbers or NaN
+    for index in np.flatnonzero(~strings):
+        value = uniques[index]
+        if pd.isna(value):
+            continue
+        if isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)):
+            kinds[index] = CellKind.NUMBER
+            values[index] = value
+            is_integer[index] = isinstance(value, (int, np.integer))
+        else:
+            kinds[index] = CellKind.OTHER
+
+    lists: List[int] = list()
+    remaining: List[int] = list()
+    for index in np.flatnonzero(strings):
+        value = uniques[index]
+        if "nan" in value.lower():
+            continue
+        if NUMBER_RE.fullmatch(value):
+            try:
+                values[index] = float(value)
+            except OverflowError:
+                remaining.append(index)
+                continue
+            kinds[index] = CellKind.NUMBER
+            is_integer[index] = INTEGER_RE.fullmatch(value) is not None
+        elif EMPTY_LIST_RE.fullmatch(value):
+            kinds[index] = CellKind.EMPTY_LIST
+        elif LIST_RE.fullmatch(value):
+            kinds[index] = CellKind.LIST
+            lists.append(index)
+        else:
+            remaining.append(index)
+
+    # Flat lists of numbers are averaged in bulk
+    if lists:
+        values[lists] = list_means([uniques[index][1:-1].split(",") for index in lists])
+
+    # Everything else goes through the literal parser
+    for index in remaining:
+        kinds[index], values[index], is_integer[index] = _classify_literal(uniques[index])
+
+    return ClassifiedCells(kinds[codes], values[codes], is_string[codes], is_integer[codes])
+
+
+def list_means(lists: List[list]) -> np.ndarray:
+    """
+    Function to calculate the means of many non-empty lists at once. Lists of the same
+    length are summed row-wise, which keeps the summation order (and therefore the exact
+    result) of np.mean.
+
+    Parameters:
+    -----------
+    lists : List[list]
+        the lists, their elements have to be convertible to float
+
+    Returns:
+    --------
+    means : np.ndarray
+        the float64 mean of every list
+    """
+    means = np.empty(len(lists), dtype=np.float64)
+    lengths = np.array([len(values) for values in lists])
+    for length in np.unique(lengths):
+        indices = np.flatnonzero(lengths == length)
+        block = np.array([lists[index] for index in indices], dtype=np.float64)
+        means[indices] = block.sum(axis=1) / length
+    return means
+
+
+def _classify_literal(value: str):
+    """
+    Classifies a string the regular expressions don't cover, returns kind, value and
+    whether it is an integer.
+    """
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return CellKind.MALFORMED, np.nan, False
+
+    if isinstance(parsed, bool):
+        return CellKind.OTHER, np.nan, False
+    if isinstance(parsed, (int, float)):
+        if pd.isna(parsed):
+            return CellKind.NAN, np.nan, False
+        try:
+            return CellKind.NUMBER, float(parsed), isinstance(parsed, int)
+        except OverflowError:
+            return CellKind.OTHER, np.nan, False
+    if isinstance(parsed, list):
+        if not parsed:
+            return CellKind.EMPTY_LIST, np.nan, False
+        try:
+            return CellKind.LIST, float(np.mean(parsed)), False
+        except (TypeError, ValueError):
+            return CellKind.MALFORMED, np.nan, False
+    if parsed is None:
+        return CellKind.NAN, np.nan, False
+    return CellKind.OTHER, np.nan, False
@@ -1,14 +1,31 @@
-import math
+import hashlib
+import json
 import sys
 import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
 import os as os
 import ast
 
+from datasets.cell_parser import INTEGER_RE, CellKind, classify_cells
+
+
+# Extrapolate a single file inside a worker process, returns the manifest entry of its source. The hash of the source
+# is computed here as well, so the parent process doesn't hash the finished files one after another
+def _extrapolate_worker(source_directory: str, destination_directory: str, strategy: str, dataset: str, metric: str,
+                        fingerprint: dict):
+    warnings.filterwarnings('ignore')
+    extrapolation = Extrapolation(source_directory, destination_directory)
+    if fingerprint["sha1"] is None:
+        fingerprint["sha1"] = Extrapolation.hash_file(extrapolation.get_source_path(strategy, dataset, metric))
+    extrapolation.extrapolate(strategy, dataset, metric)
+    return strategy, dataset, metric, fingerprint
+
 
 class Extrapolation:
+    MANIFEST_NAME = "manifest.json"
 
     def __init__(self, source_directory: str, destination_directory: str):
         self.source_directory = source_directory
@@ -24,6 +41,106 @@ class Extrapolation:
             for metric in Extrapolation.get_files(metric_path):
                 self.extrapolate(strategy, dataset, metric)
 
+    # Extrapolate every file of the source tree with a process pool, files whose source didn't change since the last
+    # run (according to the manifest in the destination directory) are skipped. A failing file is reported and left out
+    # of the manifest, the other files are still recorded. Returns the keys of the failed files
+    def extrapolate_all(self, num_workers: int = None, save_every: int = 50):
+        manifest = self.load_manifest()
+
+        # Collect all files that need to be (re)done
+        tasks = []
+        skipped = 0
+        for strategy in Extrapolation.get_subdirectories(self.source_directory):
+            dataset_path = f"{self.source_directory}/{strategy}/"
+            for dataset in Extrapolation.get_subdirectories(dataset_path):
+                metric_path = f"{dataset_path}/{dataset}/"
+                for metric in Extrapolation.get_files(metric_path):
+                    key = f"{strategy}/{dataset}/{metric}"
+                    fingerprint = self.check_source(manifest, strategy, dataset, metric)
+                    if fingerprint is None:
+                        skipped += 1
+                        continue
+                    if fingerprint["sha1"] is not None and manifest.get(key, {}).get("sha1") == fingerprint["sha1"]:
+                        # Only touched, not changed
+                        manifest[key] = fingerprint
+                        skipped += 1
+                        continue
+                    tasks.append((strategy, dataset, metric, fingerprint))
+
+        print(f"Extrapolating {len(tasks)} files, skipping {skipped} unchanged files")
+
+        done = 0
+        failed = []
+        try:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                futures = {
+                    executor.submit(_extrapolate_worker, self.source_directory, self.destination_directory, *task):
+                        f"{task[0]}/{task[1]}/{task[2]}"
+                    for task in tasks
+                }
+                for future in as_completed(futures):
+                    try:
+                        strategy, dataset, metric, fingerprint = future.result()
+                    except Exception as error:
+                        print(f"Could not extrapolate {futures[future]}: {type(error).__name__}: {error}")
+                        failed.append(futures[future])
+                        continue
+                    manifest[f"{strategy}/{dataset}/{metric}"] = fingerprint
+                    done += 1
+                    if done % save_every == 0:
+                        self.save_manifest(manifest)
+        finally:
+            # Record everything that has been finished, even if a file failed
+            self.save_manifest(manifest)
+
+        if failed:
+            print(f"Failed to extrapolate {len(failed)} of {len(tasks)} files: {sorted(failed)}")
+        return failed
+
+    # Returns the fingerprint of a source file if it has to be extrapolated, None if its output is up to date. The hash
+    # is only computed if size and modification time don't decide it.
+    def check_source(self, manifest: dict, strategy: str, dataset: str, metric: str):
+        source_path = self.get_source_path(strategy, dataset, metric)
+        stat = os.stat(source_path)
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": None}
+
+        entry = manifest.get(f"{strategy}/{dataset}/{metric}")
+        if entry is None or not os.path.exists(f"{self.destination_directory}/{strategy}/{dataset}/{metric}.csv.xz"):
+            return fingerprint
+        if entry["size"] == fingerprint["size"] and entry["mtime_ns"] == fingerprint["mtime_ns"]:
+            return None
+        if entry["size"] == fingerprint["size"]:
+            fingerprint["sha1"] = Extrapolation.hash_file(source_path)
+        return fingerprint
+
+    # Load the manifest of already extrapolated files
+    def load_manifest(self) -> dict:
+        path = f"{self.destination_directory}/{Extrapolation.MANIFEST_NAME}"
+        if not os.path.exists(path):
+            return dict()
+        with open(path, "r") as file:
+            return json.load(file)
+
+    # Save the manifest atomically, so an interrupted run never corrupts it
+    def save_manifest(self, manifest: dict):
+        if not os.path.exists(self.destination_directory):
+            os.makedirs(self.destination_directory)
+        path = f"{self.destination_directory}/{Extrapolation.MANIFEST_NAME}"
+        with open(path + ".tmp", "w") as file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def get_source_path(self, strategy: str, dataset: str, metric: str) -> str:
+        return f"{self.source_directory}/{strategy}/{dataset}/{metric}.csv.xz"
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                sha1.update(chunk)
+        return sha1.hexdigest()
+
     # Extrapolate the dataframe of a given strategy, dataset and metric
     def extrapolate(self, strategy: str, dataset: str, metric: str):
 
@@ -40,76 +157,149 @@ class Extrapolation:
         # Path where changed CSV file is written to
         subdirectories: str = f"{self.destination_directory}/{strategy}/{dataset}"
 
-        # Save changed dataframe
-        if not os.path.exists(subdirectories):
-            os.makedirs(subdirectories)
+        # Save changed dataframe, other workers may create the directory at the same time
+        os.makedirs(subdirectories, exist_ok=True)
 
         frame.to_csv(f"{subdirectories}/{metric}.csv.xz", index=False)
 
+    # Extrapolate all time series of a frame in one pass over its columns. Every column is classified once, rows
+    # whose time series ended in or before the column are filled with zero for lag metrics or the last valid value
     @staticmethod
     def do_everything(frame: pd.DataFrame, is_lag: bool, file_name: str):
-        second_last_columns = len(frame.columns) - 1
-        for row_idx, row in frame.iterrows():
-            last_valid = 0
-            for col_idx, column in enumerate(frame.columns):
-                # Get the current value
+        # The last column (EXP_UNIQUE_ID) is never extrapolated
+        metric_columns = list(frame.columns[:-1])
+        num_rows = len(frame)
+        if num_rows == 0 or not metric_columns:
+            return frame
+
+        # Rows whose time series ended in a former column, the value they are filled with and
+        # the value every row handed on as last valid value in the former column
+        ended = np.zeros(num_rows, dtype=bool)
+        fill = np.zeros(num_rows, dtype=object)
+        last_valid = None
+
+        for col_idx, name in enumerate(metric_columns):
+            original = frame[name].to_numpy()
+            processed, carry = original, original
+            malformed = np.zeros(num_rows, dtype=bool)
+            # The value a terminal cell keeps instead of the fill value, None if it is filled
+            at_terminal = None
+
+            if original.dtype.kind in "biufc":
+                # Numeric columns need no parsing, only NaN ends a time series
+                terminal = pd.isna(original) if original.dtype.kind in "fc" else np.zeros(num_rows, dtype=bool)
+            else:
+                cells = classify_cells(original)
+                kinds, values = cells.kinds, cells.values
+                processed = original.astype(object)
+                carry = processed.copy()
+                malformed = kinds == CellKind.MALFORMED
+                at_terminal = np.full(num_rows, None, dtype=object)
+
+                # NaN-like cells, empty lists and zero strings end the time series
+                numbers = (kinds == CellKind.NUMBER) & cells.is_string
+                zeros = numbers & (values == 0)
+                terminal = (kinds == CellKind.NAN) | (kinds == CellKind.EMPTY_LIST) | zeros
+
+                # Empty lists and parsed zero floats keep their own value
+                at_terminal[kinds == CellKind.EMPTY_LIST] = 0
+                zero_floats = zeros & ~cells.is_integer
+                at_terminal[zero_floats] = values[zero_floats].tolist()
+
+                # If 'parsed' is a float, save its float version
+                floats = numbers & ~cells.is_integer & ~zeros
+                processed[floats] = carry[floats] = values[floats].tolist()
+
+                # If it is a list, use its mean
+                lists = kinds == CellKind.LIST
+                means = values[lists].astype(object)
+                means[np.isnan(values[lists])] = 0
+                processed[lists] = carry[lists] = means
+
+                # Integers and other literals keep their string, but hand on the parsed value
+                literals = (numbers & cells.is_integer & ~zeros) | ((kinds == CellKind.OTHER) & cells.is_string)
+                parsed = {
+                    value: int(value) if INTEGER_RE.fullmatch(value) else ast.literal_eval(value)
+                    for value in set(original[literals])
+                }
+                for row_idx in np.flatnonzero(literals):
+                    carry[row_idx] = parsed[original[row_idx]]
+
+                    # Falsy literals like 'False' or '()' end the time series as well
+                    if not carry[row_idx]:
+                        terminal[row_idx] = True
+
+            # Rows ending in this column are filled with the last valid value of the former column
+            ending = terminal & ~ended
+            filled = ended | terminal
+            if not is_lag and last_valid is not None:
+                fill[ending] = last_valid[ending]
+
+            # Report weirdly formatted cells in front of the terminal cell
+            for row_idx in np.flatnonzero(malformed & ~filled):
                 value = frame.iloc[row_idx, col_idx]
-
-                # If 'value' is NaN, set all of its successors according to is_leg
-                if Extrapolation.is_nan(value):
-                    value = last_valid
-                    frame.iloc[row_idx, col_idx:second_last_columns] = 0 if is_lag else last_valid
-
-                # Check if 'value' is a string
-                if isinstance(value, str) and not isinstance(value, list):
-                    try:
-                        value = ast.literal_eval(value)
-
-                        # If 'parsed' == [], set all of its successors according to is_leg
-                        if not value:
-                            frame.iloc[row_idx, col_idx:second_last_columns] = 0 if is_lag else last_valid
-
-                        # If 'parsed' is a float, save its float version
-                        if isinstance(value, float):
-                            frame.iloc[row_idx, col_idx] = value
-
-                    # If the value is weirdly formatted, pass
-                    except ValueError:
-                        if not isinstance(value, list):
-                            print(f"Tried to cast {value} (Type: {type(value)}) of {file_name} at index:({row_idx},{col_idx})\n")
-                            value = frame.iloc[row_idx, col_idx]
-
-                # If it is a list, calculate the mean
-                if isinstance(value, list):
-                    mean = np.mean(value)
-                    value = mean if not Extrapolation.is_nan(mean) else 0
-                    frame.iloc[row_idx, col_idx] = value
-
-                # Update last valid value
-                last_valid = value
+                print(f"Tried to cast {value} (Type: {type(value)}) of {file_name} at index:({row_idx},{col_idx})\n")
+
+            replacement = fill[filled]
+            if at_terminal is not None:
+                own = ending[filled] & (at_terminal[filled] != None)  # noqa: E711
+                replacement[own] = at_terminal[filled][own]
+
+            if len(replacement) and (processed.dtype == object or processed.dtype.kind == "b"):
+                # Bool columns become object columns like in pandas
+                processed = processed.astype(object)
+                processed[filled] = replacement
+            elif len(replacement):
+                # Numeric columns stay numeric until the first non-numeric value is written
+                numeric = np.array([isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+                                    for value in replacement], dtype=bool)
+                first_other = numeric.argmin() if not numeric.all() else len(numeric)
+                dtype = Extrapolation.promote(processed.dtype, replacement[:first_other])
+
+                # Rows behind the write that upcasts the column hand on the upcasted value
+                if dtype != processed.dtype:
+                    upcast = np.array([Extrapolation.promote(processed.dtype, replacement[index:index + 1])
+                                       != processed.dtype for index in range(first_other)], dtype=bool)
+                    upcast_row = np.flatnonzero(filled)[upcast.argmax()]
+                    carry = processed.astype(object)
+                    carry[upcast_row + 1:] = processed[upcast_row + 1:].astype(dtype).astype(object)
+
+                if first_other == len(numeric):
+                    processed = processed.astype(dtype)
+                    processed[filled] = replacement.tolist()
+                else:
+                    replacement[:first_other] = [dtype.type(value) for value in replacement[:first_other]]
+                    processed = processed.astype(dtype).astype(object)
+                    processed[filled] = replacement
+
+            if processed is not original:
+                frame[name] = processed
+
+            last_valid = carry
+            ended = filled
 
         # Return the frame
         return frame
 
+    # Returns the dtype a numeric column gets if the given numbers are written into it,
+    # like pandas integral floats don't upcast integer columns
+    @staticmethod
+    def promote(dtype: np.dtype, values: np.ndarray) -> np.dtype:
+        if not len(values):
+            return dtype
+        values = np.array(values.tolist())
+        if dtype.kind in "iu" and values.dtype.kind == "f":
+            with np.errstate(invalid="ignore"):
+                if np.array_equal(values.astype(dtype), values):
+                    return dtype
+        return np.result_type(dtype, values.dtype)
+
+    # Check a single cell for NaN, see classify_cells for whole columns
     @staticmethod
     def is_nan(value) -> bool:
-        if pd.isna(value):
-            return True
-
-        if isinstance(value, str):
-            if "nan" in value.lower():
-                return True
-
-            try:
-                parsed = ast.literal_eval(value)
-
-                if isinstance(parsed, (float, int, np.float_)) and math.isnan(parsed) or pd.isna(parsed):
-                    return True
-
-            except ValueError:
-                pass
-
-        return False
+        cells = np.empty(1, dtype=object)
+        cells[0] = value
+        return classify_cells(cells).kinds[0] == CellKind.NAN
 
     @staticmethod
     def get_subdirectories(path: str):
@@ -127,6 +317,12 @@ extrapolation = Extrapolation(
 
 warnings.filterwarnings('ignore')
 
-if len(sys.argv) > 1:
-    index = int(sys.argv[1])
-    extrapolation.extrapolate_strategy(index)
+# 'all [num_workers]' extrapolates the whole tree in parallel, an integer only the strategy at that index
+if __name__ == "__main__" and len(sys.argv) > 1:
+    if sys.argv[1] == "all":
+        # A failed file fails the job, the next run only redoes the failed files
+        if extrapolation.extrapolate_all(num_workers=int(sys.argv[2]) if len(sys.argv) > 2 else None):
+            sys.exit(1)
+    else:
+        index = int(sys.argv[1])
+        extrapolation.extrapolate_strategy(index)
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict
+
+import pandas as pd
+from pyarrow import feather
+
+
+class FrameCache:
+    """
+    The FrameCache class keeps the already merged strategy/dataset/metric frames in an
+    uncompressed Arrow IPC (feather) tree, so that later loads can memory-map them instead
+    of decoding the .csv.xz sources again.
+    """
+
+    MANIFEST_NAME: str = "manifest.json"
+    VERSION: int = 1
+
+    cache_dir: str
+    base_dir: str
+    workload_path: str
+    entries: Dict[str, Dict[str, int]]
+
+    def __init__(self, cache_dir: str, base_dir: str, workload_path: str) -> None:
+        """
+        Init function.
+
+        Parameters:
+        -----------
+        cache_dir : str
+            the directory the cached frames and the manifest are written to
+        base_dir : str
+            the base directory of the .csv.xz result tree
+        workload_path : str
+            the path to the done workload the frames are merged with
+        -----------
+
+        Returns:
+        --------
+        None
+            only the initialized object
+        """
+        self.cache_dir = cache_dir
+        self.base_dir = base_dir
+        self.workload_path = workload_path
+        self.entries = dict()
+        self.dirty = False
+
+        manifest_path = os.path.join(cache_dir, self.MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as file:
+                manifest = json.load(file)
+            # a changed workload or layout invalidates every merged frame
+            if (
+                manifest.get("version") == self.VERSION
+                and manifest.get("workload_mtime_ns") == self._mtime_ns(workload_path)
+            ):
+                self.entries = manifest.get("entries", dict())
+
+    @staticmethod
+    def _mtime_ns(path: str) -> int:
+        """
+        Returns the modification time of a file or -1 if it doesn't exist.
+        """
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return -1
+
+    @staticmethod
+    def key(strategy: str, dataset: str, metric: str) -> str:
+        """
+        Returns the manifest key for a strategy, dataset and metric.
+        """
+        return strategy + "/" + dataset + "/" + metric
+
+    def source_path(self, strategy: str, dataset: str, metric: str) -> str:
+        """
+        Returns the path of the .csv.xz source file.
+        """
+        return os.path.join(self.base_dir, strategy, dataset, metric + ".csv.xz")
+
+    def frame_path(self, strategy: str, dataset: str, metric: str) -> str:
+        """
+        Returns the path of the cached frame.
+        """
+        return os.path.join(self.cache_dir, strategy, dataset, metric + ".feather")
+
+    def is_fresh(self, strategy: str, dataset: str, metric: str) -> bool:
+        """
+        Function to check whether a cached frame exists and is newer than its source.
+
+        Parameters:
+        -----------
+        strategy : str
+            the name of the strategy
+        dataset : str
+            the name of the dataset
+        metric : str
+            the name of the metric
+
+        Returns:
+        --------
+        fresh : bool
+            True if the cached frame can be used instead of the source file
+        """
+        entry = self.entries.get(self.key(strategy, dataset, metric))
+        if entry is None:
+            return False
+        return entry["source_mtime_ns"] == self._mtime_ns(
+            self.source_path(strategy, dataset, metric)
+        ) and os.path.exists(self.frame_path(strategy, dataset, metric))
+
+    def read(self, strategy: str, dataset: str, metric: str) -> pd.DataFrame:
+        """
+        Function to read a cached frame through a memory map.
+
+        Parameters:
+        -----------
+        strategy : str
+            the name of the strategy
+        dataset : str
+            the name of the dataset
+        metric : str
+            the name of the metric
+
+        Returns:
+        --------
+        dataframe : pd.DataFrame
+            the merged frame
+        """
+        return feather.read_table(
+            self.frame_path(strategy, dataset, metric), memory_map=True
+        ).to_pandas()
+
+    def write(
+        self, strategy: str, dataset: str, metric: str, data_frame: pd.DataFrame
+    ) -> None:
+        """
+        Function to write a merged frame into the cache. The manifest is only updated in
+        memory, call save_manifest to persist it.
+
+        Parameters:
+        -----------
+        strategy : str
+            the name of the strategy
+        dataset : str
+            the name of the dataset
+        metric : str
+            the name of the metric
+        data_frame : pd.DataFrame
+            the merged frame
+
+        Returns:
+        --------
+        None
+        """
+        path = self.frame_path(strategy, dataset, metric)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        feather.write_feather(
+            data_frame.reset_index(drop=True), path, compression="uncompressed"
+        )
+        self.entries[self.key(strategy, dataset, metric)] = {
+            "source_mtime_ns": self._mtime_ns(
+                self.source_path(strategy, dataset, metric)
+            ),
+            "rows": int(data_frame.shape[0]),
+            "columns": int(data_frame.shape[1]),
+        }
+        self.dirty = True
+
+    def save_manifest(self) -> None:
+        """
+        Function to persist the manifest if frames were written since the last save.
+
+        Parameters:
+        -----------
+        None
+
+        Returns:
+        --------
+        None
+        """
+        if not self.dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        manifest_path = os.path.join(self.cache_dir, self.MANIFEST_NAME)
+        # write to a temporary file first, so an interrupted save never corrupts the cache
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(
+                {
+                    "version": self.VERSION,
+                    "base_dir": self.base_dir,
+                    "workload_mtime_ns": self._mtime_ns(self.workload_path),
+                    "entries": self.entries,
+                },
+                file,
+            )
+        os.replace(manifest_path + ".tmp", manifest_path)
+        self.dirty = False
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Callable, Iterator, List, Tuple
+
+import pandas as pd
+
+
+class LazyFrameStore(Mapping):
+    """
+    The LazyFrameStore class replaces the eagerly filled data_dict of the Loader. It keeps
+    the data_dict[strategy][dataset][metric] access pattern, but a frame is only loaded on
+    its first access and the least recently used frames are evicted once the loaded frames
+    exceed the byte budget.
+    """
+
+    strategies: List[str]
+    datasets: List[str]
+    metrics: List[str]
+    byte_budget: int | None
+    loaded_bytes: int
+
+    def __init__(
+        self,
+        strategies: List[str],
+        datasets: List[str],
+        metrics: List[str],
+        load_frame: Callable[[str, str, str], pd.DataFrame],
+        byte_budget: int = None,
+        on_evict: Callable[[str, str, str], None] = None,
+    ) -> None:
+        """
+        Init function.
+
+        Parameters:
+        -----------
+        strategies : List[str]
+            the strategies that can be requested
+        datasets : List[str]
+            the datasets that can be requested
+        metrics : List[str]
+            the metrics that can be requested
+        load_frame : Callable[[str, str, str], pd.DataFrame]
+            the function which loads a single frame for strategy, dataset and metric
+        byte_budget : int
+            the maximum number of bytes the loaded frames may use, unbounded if None
+        on_evict : Callable[[str, str, str], None]
+            called with strategy, dataset and metric whenever a frame is evicted
+        -----------
+
+        Returns:
+        --------
+        None
+            only the initialized object
+        """
+        self.strategies = strategies
+        self.datasets = datasets
+        self.metrics = metrics
+        self.load_frame = load_frame
+        self.byte_budget = byte_budget
+        self.on_evict = on_evict
+        self.loaded_bytes = 0
+        self.frames: OrderedDict[Tuple[str, str, str], Tuple[pd.DataFrame, int]] = (
+            OrderedDict()
+        )
+
+    def __getitem__(self, strategy: str) -> "_DatasetView":
+        if strategy not in self.strategies:
+            raise KeyError(strategy)
+        return _DatasetView(self, strategy)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.strategies)
+
+    def __len__(self) -> int:
+        return len(self.strategies)
+
+    def get_frame(self, strategy: str, dataset: str, metric: str) -> pd.DataFrame:
+        """
+        Returns a single frame, loads it on the first access.
+
+        Parameters:
+        -----------
+        strategy : str
+            the name of the strategy
+        dataset : str
+            the name of the dataset
+        metric : str
+            the name of the metric
+
+        Returns:
+        --------
+        dataframe : pd.DataFrame
+            the requested frame
+        """
+        key = (strategy, dataset, metric)
+        if key in self.frames:
+            self.frames.move_to_end(key)
+            return self.frames[key][0]
+
+        data_frame = self.load_frame(strategy, dataset, metric)
+        num_bytes = int(data_frame.memory_usage(deep=True).sum())
+        self.evict(num_bytes)
+        self.frames[key] = (data_frame, num_bytes)
+        self.loaded_bytes += num_bytes
+        return data_frame
+
+    def evict(self, num_bytes: int) -> None:
+        """
+        Function to evict the least recently used frames until num_bytes fit into the
+        byte budget.
+
+        Parameters:
+        -----------
+        num_bytes : int
+            the number of bytes that need to fit into the budget
+
+        Returns:
+        --------
+        None
+        """
+        if self.byte_budget is None:
+            return
+        while self.frames and self.loaded_bytes + num_bytes > self.byte_budget:
+            key, (_, frame_bytes) = self.frames.popitem(last=False)
+            self.loaded_bytes -= frame_bytes
+            if self.on_evict is not None:
+                self.on_evict(*key)
+
+
+class _DatasetView(Mapping):
+    """
+    The datasets of a single strategy in the LazyFrameStore.
+    """
+
+    def __init__(self, store: LazyFrameStore, strategy: str) -> None:
+        self.store = store
+        self.strategy = strategy
+
+    def __getitem__(self, dataset: str) -> "_MetricView":
+        if dataset not in self.store.datasets:
+            raise KeyError(dataset)
+        return _MetricView(self.store, self.strategy, dataset)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.datasets)
+
+    def __len__(self) -> int:
+        return len(self.store.datasets)
+
+
+class _MetricView(Mapping):
+    """
+    The metrics of a single strategy and dataset in the LazyFrameStore.
+    """
+
+    def __init__(self, store: LazyFrameStore, strategy: str, dataset: str) -> None:
+        self.store = store
+        self.strategy = strategy
+        self.dataset = dataset
+
+    def __getitem__(self, metric: str) -> pd.DataFrame:
+        if metric not in self.store.metrics:
+            raise KeyError(metric)
+        return self.store.get_frame(self.strategy, self.dataset, metric)
+
+    def __contains__(self, metric: object) -> bool:
+        # answer membership without loading the frame
+        return metric in self.store.metrics
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.store.metrics)
+
+    def __len__(self) -> int:
+        return len(self.store.metrics)
@@ -1,5 +1,7 @@
 from typing import List, Dict, Set, Tuple
 from datasets import Base_Loader
+from datasets.lazy_frames import LazyFrameStore
+import numpy as np
 import pandas as pd
 
 
@@ -9,7 +11,16 @@ class Loader(Base_Loader):
     be used in the main function to unpack all data files at once.
     """
 
-    def __init__(self, base_dir: str, wanted_metrics: List[str] = None) -> None:
+    def __init__(
+        self,
+        base_dir: str,
+        wanted_metrics: List[str] = None,
+        cache_dir: str = None,
+        num_workers: int = 1,
+        max_inflight_bytes: int = 2 * 1024**3,
+        lazy: bool = False,
+        memory_budget: int = None,
+    ) -> None:
         """
         Init function.
 
@@ -17,22 +28,68 @@ class Loader(Base_Loader):
         -----------
         base : str
             should contain the string of the base directory.
+        wanted_metrics : List[str]
+            the metrics to load, all metrics if None
+        cache_dir : str
+            directory of the columnar frame cache. The first construction converts the
+            .csv.xz tree into the cache, later ones read from it.
+        num_workers : int
+            the number of processes used for loading, values above 1 enable the
+            parallel load mode
+        max_inflight_bytes : int
+            cap on the estimated bytes of decoded frames the parallel load mode keeps
+            in flight at once
+        lazy : bool
+            if True, frames are loaded on their first access instead of all at once
+        memory_budget : int
+            the bytes the lazily loaded frames may use before the least recently used
+            ones are evicted, unbounded if None
         -----------
 
         Returns:
         --------
         None
             only the initialized object
+
+        Raises:
+        -------
+        ValueError
+            if lazy is combined with num_workers above 1
         """
+        if lazy and num_workers > 1:
+            raise ValueError(
+                "The lazy mode loads every frame on its first access and can't use the "
+                "parallel load mode, set num_workers to 1."
+            )
         # Logger.info("Start read in all data.")
         print("Start loading data")
-        super().__init__(base_dir, wanted_metrics)
-
-        if self.wanted_metrics is not None:
+        super().__init__(base_dir, wanted_metrics, cache_dir)
+
+        if lazy:
+            self.data_dict = LazyFrameStore(
+                self.strategies,
+                self.datasets,
+                self.wanted_metrics
+                if self.wanted_metrics is not None
+                else self.metrics,
+                self.load_lazy_csv,
+                memory_budget,
+                on_evict=self.drop_hyper_index,
+            )
+        elif num_workers > 1:
+            self.load_csv_parallel(
+                self.wanted_metrics
+                if self.wanted_metrics is not None
+                else self.metrics,
+                num_workers,
+                max_inflight_bytes,
+            )
+        elif self.wanted_metrics is not None:
             self.load_selected_metric_csv()
         else:
             self.load_all_csv()
 
+        self.hyperparam_set: Set[Tuple[int, int, int, int]] | None = None
         self.NUM_STRATS: int = len(self.strategies)
         self.NUM_DATASETS: int = len(self.datasets)
         # substract 1 because of unncecessary selected_indices.csv
@@ -59,7 +116,8 @@ class Loader(Base_Loader):
         self, strategy: str, dataset: str, metric: str
     ) -> pd.DataFrame:
         """
-        Returns a single dataframe.
+        Returns a single dataframe. In the lazy mode the frame is loaded on its first
+        access.
 
         Parameters:
         -----------
@@ -77,6 +135,37 @@ class Loader(Base_Loader):
         """
         return self.data_dict[strategy][dataset][metric]
 
+    def get_hyper_rows(
+        self, strategy: str, dataset: str, metric: str, hyper_tuple: Tuple[int, ...]
+    ) -> pd.DataFrame:
+        """
+        Returns the rows of a single dataframe that belong to a hyperparameter tuple. The
+        lookup uses the index built at load time instead of scanning the frame.
+
+        Parameters:
+        -----------
+        strategy : str
+            the name of the strategy you want to have
+        dataset : str
+            the dataset you search in for the metric
+        metric : str
+            the metric name you want to have
+        hyper_tuple : Tuple[int, ...]
+            the values of the HYPER_COLUMNS in their order
+
+        Returns:
+        --------
+        dataframe : pd.DataFrame
+            the matching rows, empty if the tuple wasn't sampled
+        """
+        frame: pd.DataFrame = self.get_single_dataframe(strategy, dataset, metric)
+        positions: np.ndarray | None = self.hyper_index[(strategy, dataset, metric)].get(
+            tuple(hyper_tuple)
+        )
+        if positions is None:
+            return frame.iloc[0:0]
+        return frame.iloc[positions]
+
     def get_strategy_names(self) -> List[str]:
         """
         Function to get the names of all aplied strategies.
@@ -140,15 +229,8 @@ class Loader(Base_Loader):
         hyperparam_set : Set[Tuple[int, int, int, int, int]]
             a set of tuples containing the hyperparameter values in tuple
         """
-        frame = self.hyperparameters.copy()
-        # get the frame with the important columns
-        frame = frame[
-            [
-                "EXP_START_POINT",
-                "EXP_BATCH_SIZE",
-                "EXP_LEARNER_MODEL",
-                "EXP_TRAIN_TEST_BUCKET_SIZE",
-            ]
-        ]
-        hyperparam_set = set(frame.apply(tuple, axis=1))
-        return hyperparam_set
+        if self.hyperparam_set is None:
+            # get the frame with the important columns
+            frame = self.hyperparameters[self.HYPER_COLUMNS]
+            self.hyperparam_set = set(frame.itertuples(index=False, name=None))
+        return self.hyperparam_set
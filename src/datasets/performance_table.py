@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from .batch_sizes import BATCH_SIZES
+
+
+class PerformanceTable:
+    """
+    The PerformanceTable class holds the rankings of the dataset_batch_size/{dataset}_{batch_size}.json
+    files as one table with the columns dataset, batch_size, metric, strategy and score. Every
+    ranking file is only read again if it changed, so adding the results of one dataset only reads
+    that dataset. The performance aggregates are built from the table instead of the files. The
+    persisted table stores its ranking directory, a table of another directory is discarded.
+    """
+
+    # the key of the ranking directory in the metadata of the persisted table
+    DIRECTORY_KEY: bytes = b"directory"
+
+    # rank is the position of the strategy in the ranking of the metric, -1 marks a metric without strategies and -2
+    # a file without metrics, so that empty files are persisted as well
+    COLUMNS: List[str] = ["metric", "rank", "strategy", "score", "integral"]
+
+    directory: str
+    table_path: str | None
+    blocks: Dict[Tuple[str, int], pd.DataFrame]
+    mtimes: Dict[Tuple[str, int], int]
+
+    def __init__(self, directory: str, table_path: str = None) -> None:
+        """
+        Init function.
+
+        Parameters:
+        -----------
+        directory : str
+            the directory of the {dataset}_{batch_size}.json ranking files
+        table_path : str
+            the feather file the table is persisted to, the table is only kept in memory if None
+        -----------
+
+        Returns:
+        --------
+        None
+            only the initialized object
+        """
+        self.directory = directory
+        self.table_path = table_path
+        self.blocks = OrderedDict()
+        self.mtimes = dict()
+        self.dirty = False
+
+        if table_path is not None and os.path.exists(table_path):
+            table = feather.read_table(table_path)
+            metadata = table.schema.metadata or {}
+            if metadata.get(self.DIRECTORY_KEY) != self.directory_id.encode():
+                # the table was built from another directory, it is rebuilt and overwritten on the next save
+                print(f"Ignoring {table_path}, it doesn't belong to {directory}")
+                self.dirty = True
+                return
+            table = table.to_pandas()
+            for (dataset, batch_size), block in table.groupby(["dataset", "batch_size"], sort=False):
+                key = (dataset, int(batch_size))
+                self.mtimes[key] = int(block["mtime_ns"].iloc[0])
+                self.blocks[key] = block[self.COLUMNS].reset_index(drop=True)
+
+    @staticmethod
+    def _mtime_ns(path: str) -> int:
+        """
+        Returns the modification time of a file or -1 if it doesn't exist.
+        """
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return -1
+
+    @property
+    def directory_id(self) -> str:
+        """
+        Returns the normalized ranking directory, as stored in the persisted table.
+        """
+        return os.path.realpath(self.directory)
+
+    @staticmethod
+    def table_path_for(destination: str, directory: str) -> str:
+        """
+        Returns the path of the persisted table of a ranking directory inside destination. Every
+        ranking directory gets a file of its own, so consumers of different directories never
+        overwrite each other's table.
+        """
+        digest = hashlib.sha1(os.path.realpath(directory).encode()).hexdigest()[:12]
+        return f"{destination}/performance_table_{digest}.feather"
+
+    def source_path(self, dataset: str, batch_size: int) -> str:
+        """
+        Returns the path of the ranking file of a dataset and batch size.
+        """
+        return f"{self.directory}/{dataset}_{batch_size}.json"
+
+    def add(self, dataset: str, batch_size: int, rankings: Dict[str, List[Tuple[str, float]]],
+            mtime_ns: int = -1) -> None:
+        """
+        Function to put the rankings of a dataset and batch size into the table, replacing the
+        former rows of the dataset and batch size.
+
+        Parameters:
+        -----------
+        dataset : str
+            the name of the dataset
+        batch_size : int
+            the batch size
+        rankings : Dict[str, List[Tuple[str, float]]]
+            the ranked strategies and their scores of every metric, like in the ranking files
+        mtime_ns : int
+            the modification time of the ranking file the rankings are from
+
+        Returns:
+        --------
+        None
+        """
+        rows = []
+        for metric, ranking in rankings.items():
+            if not ranking:
+                rows.append((metric, -1, "", 0.0, False))
+            for rank, (strategy, score) in enumerate(ranking):
+                rows.append((metric, rank, strategy, float(score), isinstance(score, int)))
+        if not rows:
+            rows.append(("", -2, "", 0.0, False))
+        self.blocks[(dataset, batch_size)] = pd.DataFrame(rows, columns=self.COLUMNS)
+        self.mtimes[(dataset, batch_size)] = mtime_ns
+        self.dirty = True
+
+    def update(self, datasets: List[str], batch_sizes: List[int] = BATCH_SIZES, skip_invalid: bool = False) -> None:
+        """
+        Function to read the ranking files which are new or changed since they were read last.
+
+        Parameters:
+        -----------
+        datasets : List[str]
+            the names of the datasets
+        batch_sizes : List[int]
+            the batch sizes
+        skip_invalid : bool
+            if True, a file which isn't valid JSON is read as empty file instead of raising an error
+
+        Returns:
+        --------
+        None
+        """
+        for dataset in datasets:
+            for batch_size in batch_sizes:
+                file_name = self.source_path(dataset, batch_size)
+                mtime_ns = self._mtime_ns(file_name)
+                if mtime_ns != -1 and self.mtimes.get((dataset, batch_size)) == mtime_ns:
+                    continue
+                with open(file_name, 'r') as file:
+                    try:
+                        rankings = json.load(file)
+                    except json.decoder.JSONDecodeError:
+                        if not skip_invalid:
+                            raise
+                        rankings = {}
+                        print(file_name)
+                self.add(dataset, batch_size, rankings, mtime_ns)
+        self.save()
+
+    def save(self) -> None:
+        """
+        Function to persist the table if it changed since the last save.
+
+        Parameters:
+        -----------
+        None
+
+        Returns:
+        --------
+        None
+        """
+        if self.table_path is None or not self.dirty:
+            return
+        blocks = [block.assign(dataset=dataset, batch_size=batch_size, mtime_ns=self.mtimes[(dataset, batch_size)])
+                  for (dataset, batch_size), block in self.blocks.items()]
+        table = pd.concat(blocks, ignore_index=True) if blocks else pd.DataFrame(
+            columns=["dataset", "batch_size", "mtime_ns"] + self.COLUMNS)
+        table = table.astype({"dataset": str, "batch_size": "int64", "mtime_ns": "int64", "metric": str,
+                              "rank": "int64", "strategy": str, "score": "float64", "integral": bool})
+        table = pa.Table.from_pandas(table, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), self.DIRECTORY_KEY: self.directory_id.encode()}
+        )
+        # write to a temporary file first, so an interrupted save never corrupts the table
+        feather.write_feather(table, self.table_path + ".tmp", compression="uncompressed")
+        os.replace(self.table_path + ".tmp", self.table_path)
+        self.dirty = False
+
+    def rankings(self, dataset: str, batch_size: int) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Function to get the rankings of a dataset and batch size back from the table.
+
+        Parameters:
+        -----------
+        dataset : str
+            the name of the dataset
+        batch_size : int
+            the batch size
+
+        Returns:
+        --------
+        rankings : Dict[str, List[Tuple[str, float]]]
+            the ranked strategies and their scores of every metric, in the order of the ranking file
+        """
+        result = {}
+        block = self.blocks.get((dataset, batch_size))
+        if block is None:
+            return result
+        for metric, rank, strategy, score, integral in zip(block["metric"].tolist(), block["rank"].tolist(),
+                                                           block["strategy"].tolist(), block["score"].tolist(),
+                                                           block["integral"].tolist()):
+            if rank == -2:
+                continue
+            ranking = result.setdefault(metric, [])
+            if rank >= 0:
+                ranking.append((strategy, int(score) if integral else score))
+        return result
+
+    def average_performance(self, datasets: List[str], batch_sizes: List[int] = BATCH_SIZES) -> Dict:
+        """
+        Function to collect the rankings of every batch size and dataset.
+
+        Parameters:
+        -----------
+        datasets : List[str]
+            the names of the datasets, in the order of the result
+        batch_sizes : List[int]
+            the batch sizes
+
+        Returns:
+        --------
+        result : Dict
+            the rankings as result[batch_size][dataset][metric], datasets without rankings are left out
+        """
+        result = {batch_size: {} for batch_size in batch_sizes}
+        for dataset in datasets:
+            for batch_size in batch_sizes:
+                rankings = self.rankings(dataset, batch_size)
+                if rankings:
+                    result[batch_size][dataset] = rankings
+        return result
+
+    def performance(self, datasets: List[str], batch_sizes: List[int] = BATCH_SIZES) -> Dict:
+        """
+        Function to find the datasets a strategy performs best on for every batch size and metric.
+
+        Parameters:
+        -----------
+        datasets : List[str]
+            the names of the datasets
+        batch_sizes : List[int]
+            the batch sizes
+
+        Returns:
+        --------
+        result : Dict
+            the datasets and scores as result[batch_size][metric][strategy], sorted by score in
+            descending order
+        """
+        result = {}
+        for dataset in datasets:
+            for batch_size in batch_sizes:
+                for metric, ranking in self.rankings(dataset, batch_size).items():
+                    # a strategy ranked twice for a dataset receives the sum of its scores
+                    scores = {}
+                    for strategy, score in ranking:
+                        scores[strategy] = scores.get(strategy, 0) + score
+                    for strategy, score in scores.items():
+                        strategies = result.setdefault(batch_size, {}).setdefault(metric, {})
+                        strategies.setdefault(strategy, []).append((dataset, score))
+
+        for metrics in result.values():
+            for strategies in metrics.values():
+                for strategy, values in strategies.items():
+                    strategies[strategy] = sorted(values, key=lambda x: x[1], reverse=True)
+        return result
+
+    @staticmethod
+    def top_k_performance(performance: Dict, datasets: List[str], k: int) -> Dict:
+        """
+        Function to keep only the k best strategies of every dataset, batch size and metric.
+
+        Parameters:
+        -----------
+        performance : Dict
+            the result of performance
+        datasets : List[str]
+            the names of the datasets, in the order of the result
+        k : int
+            the number of strategies to keep
+
+        Returns:
+        --------
+        result : Dict
+            the datasets and scores of the k best strategies as result[batch_size][metric][strategy]
+        """
+        result = {}
+        for batch_size, metrics in performance.items():
+            result[batch_size] = {}
+            for metric, strategies in metrics.items():
+                result[batch_size][metric] = {}
+                # invert the strategy -> dataset lists once instead of scanning them for every dataset
+                by_dataset = {}
+                for strategy, values in strategies.items():
+                    for dataset, score in values:
+                        by_dataset.setdefault(dataset, []).append((strategy, score))
+
+                for dataset in datasets:
+                    strategy_scores = sorted(by_dataset.get(dataset, []), key=lambda x: x[1], reverse=True)
+                    for strategy, score in strategy_scores[:k]:
+                        result[batch_size][metric].setdefault(strategy, []).append([dataset, score])
+        return result
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Callable
+
+import numpy as np
+
+
+class Scorer(ABC):
+    """
+    An abstract class defining the interface of the scoring functions. A scorer scores all
+    time series of a frame at once, one series per row.
+    """
+
+    name: str
+    needs_baseline: bool = False
+
+    @abstractmethod
+    def score(self, series: np.ndarray, baseline: np.ndarray = None) -> np.ndarray:
+        """
+        An abstract method every scorer should implement.
+
+        Parameters:
+        -----------
+        series : np.ndarray
+            the float64 time series, shaped series x AL-cycle
+        baseline : np.ndarray
+            the average time series of the random strategy, only passed to scorers with
+            needs_baseline
+
+        Returns:
+        --------
+        scores : np.ndarray
+            the score of every series
+        """
+        ...
+
+    def __call__(self, series: np.ndarray) -> float:
+        """
+        Scores a single time series, like the plain scoring functions.
+        """
+        return self.score(np.asarray(series, dtype=np.float64)[np.newaxis, :])[0]
+
+
+class IntegralScorer(Scorer):
+    """
+    The area under the time series, every AL-cycle has the width 1.
+    """
+
+    name = "integral"
+
+    def score(self, series: np.ndarray, baseline: np.ndarray = None) -> np.ndarray:
+        return np.sum(series, axis=1)
+
+
+class FinalValueScorer(Scorer):
+    """
+    The value after the last AL-cycle.
+    """
+
+    name = "final_value"
+
+    def score(self, series: np.ndarray, baseline: np.ndarray = None) -> np.ndarray:
+        if series.shape[1] == 0:
+            return np.full(series.shape[0], np.nan)
+        return series[:, -1]
+
+
+class AreaAboveRandomScorer(Scorer):
+    """
+    The area between the time series and the average time series of the random strategy,
+    negative where the series is below random. Only the AL-cycles both have are compared.
+    """
+
+    name = "area_above_random"
+    needs_baseline = True
+
+    def score(self, series: np.ndarray, baseline: np.ndarray = None) -> np.ndarray:
+        if baseline is None:
+            raise ValueError("The area above random needs the time series of the random strategy.")
+        num_cycles = min(series.shape[1], baseline.shape[0])
+        return np.sum(series[:, :num_cycles] - baseline[np.newaxis, :num_cycles], axis=1)
+
+
+class SlopeScorer(Scorer):
+    """
+    The slope of the least squares line through the time series.
+    """
+
+    name = "slope"
+
+    def score(self, series: np.ndarray, baseline: np.ndarray = None) -> np.ndarray:
+        if series.shape[1] < 2:
+            return np.zeros(series.shape[0])
+        cycles = np.arange(series.shape[1], dtype=np.float64)
+        cycles -= cycles.mean()
+        return (series - series.mean(axis=1, keepdims=True)) @ cycles / np.dot(cycles, cycles)
+
+
+class RowScorer(Scorer):
+    """
+    Wraps a plain scoring function, which scores a single series, into a scorer. The
+    function gets every row as a float64 array. Frames with non-numeric cells are
+    rejected by as_series_matrix before any scorer runs, so unlike before the function
+    never sees object rows.
+    """
+
+    def __init__(self, function: Callable[[np.ndarray], float]) -> None:
+        """
+        Init function.
+
+        Parameters:
+        -----------
+        function : Callable[[np.ndarray], float]
+            the scoring function
+        -----------
+
+        Returns:
+        --------
+        None
+            only the initialized object
+        """
+        self.function = function
+        self.name = getattr(function, "__name__", "score")
+
+    def score(self, series: np.ndarray, baseline: np.ndarray = None) -> np.ndarray:
+        return np.array([self.function(row) for row in series], dtype=np.float64)
+
+
+# The built-in scorers by name
+SCORERS = {
+    scorer.name: scorer
+    for scorer in [IntegralScorer(), FinalValueScorer(), AreaAboveRandomScorer(), SlopeScorer()]
+}
+
+
+def as_scorer(score: Scorer | Callable[[np.ndarray], float] | str) -> Scorer:
+    """
+    Function to turn a scorer name or a plain scoring function into a scorer.
+
+    Parameters:
+    -----------
+    score : Scorer | Callable[[np.ndarray], float] | str
+        the scorer, the name of a built-in scorer or a function scoring a single series
+
+    Returns:
+    --------
+    scorer : Scorer
+        the scorer
+    """
+    if isinstance(score, Scorer):
+        return score
+    if isinstance(score, str):
+        return SCORERS[score]
+    return RowScorer(score)
+
+
+def as_series_matrix(values: np.ndarray) -> np.ndarray:
+    """
+    Function to convert the cells of a frame into the float64 matrix the scorers expect.
+
+    Parameters:
+    -----------
+    values : np.ndarray
+        the cells, one time series per row
+
+    Returns:
+    --------
+    series : np.ndarray
+        the time series as C-contiguous float64
+
+    Raises:
+    -------
+    TypeError
+        if a cell isn't a number, e.g. a list stored as string
+    """
+    if values.dtype.kind not in "biuf":
+        if any(not isinstance(value, (int, float, np.number)) for value in values.ravel()):
+            raise TypeError(f"The time series contain non-numeric cells of dtype {values.dtype}.")
+    # frames give column-major arrays, the row sums need rows in contiguous memory to add
+    # their values in the same order as the scoring of a single row
+    return np.ascontiguousarray(values, dtype=np.float64)
@@ -112,15 +112,9 @@ class ClusterRunner(BaseRunner):
                 for hyper_tuple in self.data.get_hyperparameter_for_metric_filtering():
                     data_vectors: List[np.ndarray] = list()
                     for strategy in self.data.get_strategy_names():
-                        frame: pd.DataFrame = self.data.get_single_dataframe(
-                            strategy, dataset, metric
+                        single_vec: pd.DataFrame = self.data.get_hyper_rows(
+                            strategy, dataset, metric, hyper_tuple
                         )
-                        single_vec: pd.DataFrame = frame.loc[
-                            (frame["EXP_START_POINT"] == hyper_tuple[0])
-                            & (frame["EXP_BATCH_SIZE"] == hyper_tuple[1])
-                            & (frame["EXP_LEARNER_MODEL"] == hyper_tuple[2])
-                            & (frame["EXP_TRAIN_TEST_BUCKET_SIZE"] == hyper_tuple[3])
-                            ]
                         single_vec = single_vec.iloc[:, :-9].dropna(axis=1)
                         # Proof if we collected some data, or data didn't exist
                         if not single_vec.empty:
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules import each other relative to src, like when running src/main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
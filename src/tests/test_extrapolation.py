@@ -0,0 +1,90 @@
+import io
+
+import pandas as pd
+import pytest
+
+from datasets.extrapolation import Extrapolation
+
+# Raw result files and the output of the original row by row extrapolation for them, as
+# (input csv, is_lag, output csv, output dtypes, printed messages)
+CASES = {
+    "strings": (
+        '0,1,2,3,EXP_UNIQUE_ID\n0.5,"[0.1, 0.2]",[],0.25,1\n0.75,nan,0.5,0.5,2\n'
+        '"[1, 2, 3]",0.0,0.5,0.5,3\n3,0.5,[nan],0.5,4\n0.5,0.25,0,0.5,5\n',
+        False,
+        "0,1,2,3,EXP_UNIQUE_ID\n0.5,0.15000000000000002,0,0.15000000000000002,1\n"
+        "0.75,0.75,0.75,0.75,2\n2.0,0.0,2.0,2.0,3\n3,0.5,0.5,0.5,4\n0.5,0.25,0.25,0.25,5\n",
+        ["object", "object", "object", "float64", "int64"],
+        "",
+    ),
+    "strings_lag": (
+        '0,1,2,3,EXP_UNIQUE_ID\n0.5,"[0.1, 0.2]",[],0.25,1\n0.75,nan,0.5,0.5,2\n'
+        '"[1, 2, 3]",0.0,0.5,0.5,3\n3,0.5,[nan],0.5,4\n0.5,0.25,0,0.5,5\n',
+        True,
+        "0,1,2,3,EXP_UNIQUE_ID\n0.5,0.15000000000000002,0,0.0,1\n0.75,0,0,0.0,2\n"
+        "2.0,0.0,0,0.0,3\n3,0.5,0,0.0,4\n0.5,0.25,0,0.0,5\n",
+        ["object", "object", "object", "float64", "int64"],
+        "",
+    ),
+    "floats": (
+        "0,1,2,3,EXP_UNIQUE_ID\n0.5,0.25,,,1\n0.75,,0.5,,2\n,0.5,0.5,0.5,3\n0.5,0.25,0.125,0.0625,4\n",
+        False,
+        "0,1,2,3,EXP_UNIQUE_ID\n0.5,0.25,0.25,0.25,1\n0.75,0.75,0.75,0.75,2\n"
+        "0.0,0.0,0.0,0.0,3\n0.5,0.25,0.125,0.0625,4\n",
+        ["float64", "float64", "float64", "float64", "int64"],
+        "",
+    ),
+    "floats_lag": (
+        "0,1,2,3,EXP_UNIQUE_ID\n0.5,0.25,,,1\n0.75,,0.5,,2\n,0.5,0.5,0.5,3\n0.5,0.25,0.125,0.0625,4\n",
+        True,
+        "0,1,2,3,EXP_UNIQUE_ID\n0.5,0.25,0.0,0.0,1\n0.75,0.0,0.0,0.0,2\n"
+        "0.0,0.0,0.0,0.0,3\n0.5,0.25,0.125,0.0625,4\n",
+        ["float64", "float64", "float64", "float64", "int64"],
+        "",
+    ),
+    "integers": (
+        "0,1,2,EXP_UNIQUE_ID\n1,0.5,,1\n2,,,2\n3,0.25,0.125,3\n",
+        False,
+        "0,1,2,EXP_UNIQUE_ID\n1,0.5,0.5,1\n2,2.0,2.0,2\n3,0.25,0.125,3\n",
+        ["int64", "float64", "float64", "int64"],
+        "",
+    ),
+    "integers_lag": (
+        "0,1,2,EXP_UNIQUE_ID\n1,0.5,,1\n2,,,2\n3,0.25,0.125,3\n",
+        True,
+        "0,1,2,EXP_UNIQUE_ID\n1,0.5,0.0,1\n2,0.0,0.0,2\n3,0.25,0.125,3\n",
+        ["int64", "float64", "float64", "int64"],
+        "",
+    ),
+    "malformed": (
+        "0,1,2,EXP_UNIQUE_ID\n0.5,abc,0.25,1\n,def,0.5,2\n0.75,None,0.5,3\n",
+        False,
+        "0,1,2,EXP_UNIQUE_ID\n0.5,abc,0.25,1\n0.0,0,0.0,2\n0.75,0.75,0.75,3\n",
+        ["float64", "object", "float64", "int64"],
+        "Tried to cast abc (Type: <class 'str'>) of test.csv.xz at index:(0,1)\n\n",
+    ),
+    "malformed_lag": (
+        "0,1,2,EXP_UNIQUE_ID\n0.5,abc,0.25,1\n,def,0.5,2\n0.75,None,0.5,3\n",
+        True,
+        "0,1,2,EXP_UNIQUE_ID\n0.5,abc,0.25,1\n0.0,0,0.0,2\n0.75,0,0.0,3\n",
+        ["float64", "object", "float64", "int64"],
+        "Tried to cast abc (Type: <class 'str'>) of test.csv.xz at index:(0,1)\n\n",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_do_everything_matches_baseline(name, capsys):
+    source, is_lag, expected, dtypes, messages = CASES[name]
+
+    frame = Extrapolation.do_everything(pd.read_csv(io.StringIO(source)), is_lag, "test.csv.xz")
+
+    assert frame.to_csv(index=False) == expected
+    assert [str(dtype) for dtype in frame.dtypes] == dtypes
+    assert capsys.readouterr().out == messages
+
+
+def test_do_everything_keeps_empty_frames():
+    frame = pd.DataFrame({"0": [], "EXP_UNIQUE_ID": []})
+
+    assert Extrapolation.do_everything(frame, False, "test.csv.xz") is frame